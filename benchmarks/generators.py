@@ -0,0 +1,83 @@
+'''
+Synthetic inputs for the benchmarks. Every generator takes a 'seed' so
+the same sizes always produce the same data.
+'''
+import csv
+import random
+
+
+def makeCancerCsv(path, rows=1000, columns=7, categories=5, targets=2,
+                  test_fraction=0.07, seed=0):
+    '''
+    Writes a CSV file shaped like 'sampleFiles/cancer.csv': categorical
+    feature columns, then the 'class' target and the count 'n'. Rows with
+    an empty target are test rows (scored by 'pyNaiveBayes').
+
+    Parameters:
+    -----------
+    path: output file.
+    rows: number of rows (train + test).
+    columns: number of feature columns.
+    categories: number of categories per feature column.
+    targets: number of target categories.
+    test_fraction: fraction of rows with an empty target.
+    seed: random seed.
+
+    Returns:
+    --------
+    path.
+    '''
+    rnd = random.Random(seed)
+    header = [f'col{j}' for j in range(columns)] + ['class', 'n']
+
+    def makeRow():
+        target = ('' if rnd.random() < test_fraction
+                  else f'target{rnd.randrange(targets)}')
+        values = [f'c{j}-{rnd.randrange(categories)}' for j in range(columns)]
+        return values + [target, rnd.randint(1, 3)]
+
+    with open(path, 'w', newline='', encoding='utf-8') as ofile:
+        writer = csv.writer(ofile)
+        writer.writerow(header)
+        writer.writerows(makeRow() for _ in range(rows))
+
+    return path
+
+
+def makeProbabilityMap(outcomes=3, seed=0):
+    '''
+    Probability map for 'probaByBruteForce': integer outcomes 1 to
+    'outcomes' with random probabilities adding up to 1.
+    '''
+    rnd = random.Random(seed)
+    weights = [rnd.random() for _ in range(outcomes)]
+    return {value+1: w/sum(weights) for value, w in enumerate(weights)}
+
+
+def makeMixture(components=3, seed=0):
+    '''
+    Mixture for 'varianceBruteForce': list of (probability, weight) tuples
+    with weights adding up to 1.
+    '''
+    rnd = random.Random(seed)
+    weights = [rnd.random() for _ in range(components)]
+    return [(rnd.random(), w/sum(weights)) for w in weights]
+
+
+def makeProbabilities(shape, seed=0, low=0.01, high=0.99):
+    '''Array of random probabilities in ['low', 'high') (numpy).'''
+    import numpy as np
+
+    return np.random.default_rng(seed).uniform(low, high, shape)
+
+
+def makeEvents(size=1000, entities=100, seed=0):
+    '''
+    Stream of 'size' events for the per-entity routines: (entity ids,
+    0/1 successes), both numpy arrays. Entity ids are strings.
+    '''
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    ids = np.char.add('e', rng.integers(0, entities, size).astype(str))
+    return ids, rng.integers(0, 2, size)
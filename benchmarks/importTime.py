@@ -0,0 +1,109 @@
+'''
+Import-time benchmark. Each module is imported in a fresh interpreter with
+"python -X importtime" and its cumulative import time is compared with a
+budget. Heavy dependencies (scipy, tabulate) must only load when a function
+that needs them runs, so importing the package stays cheap. Modules that
+don't need numpy at import time get a much smaller budget and must not
+load numpy at all.
+
+Usage (with the directory containing 'neoBayesian' on PYTHONPATH):
+
+    python -m neoBayesian.benchmarks.importTime [--package-ms 20]
+                                                [--light-ms 30]
+                                                [--numpy-ms 200]
+
+Exits with status 1 if any import goes over its budget.
+'''
+import argparse
+import subprocess
+import sys
+
+
+# modules that must import without numpy
+LIGHT_MODULES = ['neoBayesian.helpers.helpers',
+                 'neoBayesian.models.continuous.gammaPoisson',
+                 'neoBayesian.models.continuous.normalInverseGamma']
+
+# modules that import numpy at module level
+NUMPY_MODULES = ['neoBayesian.models.naive',
+                 'neoBayesian.models.discrete',
+                 'neoBayesian.models.continuous.betaBinomial',
+                 'neoBayesian.models.continuous.normalNormal',
+                 'neoBayesian.tools.others',
+                 'neoBayesian.tools.routines',
+                 'neoBayesian.tools.variance']
+
+MODULES = LIGHT_MODULES + NUMPY_MODULES
+
+
+def importTime(module, repeat=3):
+    '''
+    Best cumulative import time (milliseconds) of 'module' over 'repeat'
+    fresh interpreters, as reported by "-X importtime".
+    '''
+    def measure():
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                               f'import {module}'],
+                              capture_output=True, text=True, check=True)
+        # line format: "import time: self [us] | cumulative | package"
+        for line in proc.stderr.splitlines():
+            fields = [f.strip() for f in line.split('|')]
+            if len(fields) == 3 and fields[2] == module:
+                return int(fields[1])/1000
+
+    return min(measure() for _ in range(repeat))
+
+
+def loadsModule(module, dependency='numpy'):
+    '''True if importing 'module' also imports 'dependency'.'''
+    code = f'import sys, {module}; print({dependency!r} in sys.modules)'
+    proc = subprocess.run([sys.executable, '-c', code],
+                          capture_output=True, text=True, check=True)
+    return proc.stdout.strip() == 'True'
+
+
+def checkImportTimes(package_ms=20, light_ms=30, numpy_ms=200, repeat=3):
+    '''
+    Measures the import time of the package and of each module. Modules
+    in 'LIGHT_MODULES' also fail if they load numpy.
+
+    Returns:
+    --------
+    list of (module, milliseconds, budget, passed) tuples.
+    '''
+    budgets = ([('neoBayesian', package_ms)]
+               + [(m, light_ms) for m in LIGHT_MODULES]
+               + [(m, numpy_ms) for m in NUMPY_MODULES])
+    results = []
+    for module, budget in budgets:
+        ms = importTime(module, repeat)
+        passed = ms <= budget
+        if module in LIGHT_MODULES:
+            passed = passed and not loadsModule(module)
+        results.append((module, round(ms, 1), budget, passed))
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--package-ms', type=float, default=20,
+                        help='budget for "import neoBayesian"')
+    parser.add_argument('--light-ms', type=float, default=30,
+                        help='budget for each module without numpy')
+    parser.add_argument('--numpy-ms', type=float, default=200,
+                        help='budget for each module importing numpy')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = checkImportTimes(args.package_ms, args.light_ms, args.numpy_ms,
+                               args.repeat)
+    for module, ms, budget, passed in results:
+        print(f"{'ok  ' if passed else 'SLOW'} {module}: {ms} ms "
+              f"(budget {budget} ms)")
+
+    return 0 if all(tp[-1] for tp in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,338 @@
+'''
+Benchmark suite: time and peak memory of the public routines as the size
+of their inputs grows:
+    - rows and columns of the CSV file (naive Bayes: 'pyNaiveBayes',
+      'NaiveBayes' fit/predict, 'scoreInParallel').
+    - 'n' of the scalar discrete CDFs.
+    - iterations and outcomes of 'probaByBruteForce' (exact and sampled).
+    - 'k' of 'varianceBruteForce'.
+    - number of elements ('size') of the array routines ('*Array'
+      functions, batch posteriors, 'getStoppingK', 'bayesRuleArray',
+      'BayesianUpdater', 'Accumulator').
+Inputs come from 'benchmarks.generators'.
+
+Results can be saved as JSON and compared with the results of another
+commit: a case regresses when its time or peak memory grows more than the
+threshold (25% by default).
+
+Usage (with the directory containing 'neoBayesian' on PYTHONPATH):
+
+    python -m neoBayesian.benchmarks.suite [--sizes quick|full]
+                                           [--output results.json]
+                                           [--baseline old.json]
+                                           [--threshold 0.25]
+
+Exits with status 1 if any case regresses against the baseline.
+'''
+import argparse
+import itertools as it
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from neoBayesian.helpers.helpers import setQuiet, csvAsDicts
+from neoBayesian.models import discrete
+from neoBayesian.models.naive import (pyNaiveBayes, NaiveBayes, countCsv,
+                                      scoreInParallel)
+from neoBayesian.models.continuous import betaBinomial, normalNormal
+from neoBayesian.models.continuous.accumulator import Accumulator
+from neoBayesian.tools.others import probaByBruteForce, getTestStatsArray
+from neoBayesian.tools.routines import bayesRuleArray, BayesianUpdater
+from neoBayesian.tools.variance import (varianceBruteForce,
+                                        varianceWithFormulaArray)
+from neoBayesian.benchmarks.generators import (makeCancerCsv,
+                                               makeProbabilityMap,
+                                               makeMixture,
+                                               makeProbabilities,
+                                               makeEvents)
+
+
+SIZES = {
+    'quick': {'rows': [1000, 5000], 'columns': [4, 8],
+              'n': [100, 10000], 'iterations': [10, 50],
+              'outcomes': [3, 6], 'k': [100, 10000],
+              'size': [1000, 100000]},
+    'full': {'rows': [1000, 10000, 100000], 'columns': [4, 8, 16],
+             'n': [100, 10000, 1000000], 'iterations': [10, 100, 1000],
+             'outcomes': [3, 10], 'k': [100, 10000, 100000],
+             'size': [1000, 100000, 1000000]}
+}
+
+# processes used by the 'scoreInParallel' cases
+PROCESSES = 2
+
+# differences below these are noise, never regressions
+MIN_SECONDS = 0.002
+MIN_PEAK_KB = 64
+
+
+def grid(**params):
+    '''Every combination of the parameter lists (list of dictionaries).'''
+    return [dict(zip(params, values))
+            for values in it.product(*params.values())]
+
+
+def naiveCases(sizes, tmpdir):
+    '''Naive Bayes cases over rows x columns of a cancer.csv-like file.'''
+    cases = []
+    for params in grid(rows=sizes['rows'], columns=sizes['columns']):
+        path = os.path.join(tmpdir, 'cancer-{rows}-{columns}.csv'
+                            .format(**params))
+        makeCancerCsv(path, params['rows'], params['columns'])
+        rows = csvAsDicts(path)
+        x_train = [dc for dc in rows if dc['class']]
+        x_tests = [dc for dc in rows if not dc['class']]
+        model = NaiveBayes('class').fit(x_train)
+        tables, pairs = countCsv(path, 'class')
+        targets = list(tables['targets'])
+
+        cases += [
+            ('pyNaiveBayes', params,
+             lambda path=path: pyNaiveBayes(path, 'class')),
+            ('NaiveBayes.fitCsv', params,
+             lambda path=path: NaiveBayes('class').fitCsv(path)),
+            ('NaiveBayes.predictProba', params,
+             lambda m=model, x=x_tests: m.predictProba(x)),
+            ('scoreInParallel', params,
+             lambda t=tables, x=pairs, tg=targets:
+             scoreInParallel(t, x, tg, PROCESSES))
+        ]
+
+    return cases
+
+
+def discreteCases(sizes):
+    '''Scalar discrete CDFs over 'n'.'''
+    cases = []
+    for params in grid(n=sizes['n']):
+        n = params['n']
+        cases += [
+            ('BinomialDist.cdf', params,
+             lambda n=n: discrete.BinomialDist(n, n//2, 0.5, 'cdf')),
+            ('PoissonDist.range', params,
+             lambda n=n: discrete.PoissonDist(n, 0, n)),
+            ('GeometricDist.cdf', params,
+             lambda n=n: discrete.GeometricDist(1/n, n, 'cdf')),
+            ('UniformDist.var', params,
+             lambda n=n: discrete.UniformDist(0, n, 1, 'var'))
+        ]
+
+    return cases
+
+
+def toolCases(sizes):
+    ''''probaByBruteForce' over iterations x outcomes, 'varianceBruteForce'
+    over 'k'.'''
+    cases = []
+    for params in grid(iterations=sizes['iterations'],
+                       outcomes=sizes['outcomes']):
+        probability_map = makeProbabilityMap(params['outcomes'])
+        cutoff = params['iterations']*(params['outcomes'] + 1)/2
+        i = params['iterations']
+        cases += [
+            ('probaByBruteForce', params,
+             lambda pm=probability_map, c=cutoff, i=i:
+             probaByBruteForce(pm, c, i)),
+            ('probaByBruteForce.sample', params,
+             lambda pm=probability_map, c=cutoff, i=i:
+             probaByBruteForce(pm, c, i, mode='sample', seed=0,
+                               max_samples=10**5))
+        ]
+
+    mixture = makeMixture()
+    for params in grid(k=sizes['k']):
+        cases.append(('varianceBruteForce', params,
+                      lambda k=params['k']: varianceBruteForce(k, mixture)))
+
+    return cases
+
+
+def arrayCases(sizes):
+    '''Array routines over the number of elements ('size').'''
+    import numpy as np
+
+    cases = []
+    for params in grid(size=sizes['size']):
+        size = params['size']
+        p = makeProbabilities(size)
+        n = np.arange(size) % 100 + 1
+        k = n//2
+        groups = makeProbabilities((size, 5), seed=1)
+        weights = groups/groups.sum(axis=1, keepdims=True)
+        hypotheses = makeProbabilities((size, 5), seed=2)
+        ids, successes = makeEvents(size, max(size//100, 1))
+        likelihoods = makeProbabilities((size, 2), seed=3)
+
+        cases += [
+            ('UniformDistArray.cdf', params,
+             lambda n=n, k=k: discrete.UniformDistArray(0, n, 1, k)),
+            ('BinomialDistArray.cdf', params,
+             lambda n=n, k=k, p=p: discrete.BinomialDistArray(n, k, p,
+                                                              'cdf')),
+            ('PoissonDistArray.range', params,
+             lambda n=n, k=k: discrete.PoissonDistArray(n, k, n)),
+            ('GeometricDistArray.cdf', params,
+             lambda k=k, p=p: discrete.GeometricDistArray(p, k, 'cdf')),
+            ('getBinomialLogPmfs', params,
+             lambda size=size: discrete.getBinomialLogPmfs(
+                 size, [0.2, 0.5, 0.9])),
+            ('betaBinomial.getPosteriors', params,
+             lambda n=n, k=k: betaBinomial.getPosteriors(n, k, 1, 1)),
+            ('betaBinomial.getPosteriorsFromEvents', params,
+             lambda ids=ids, s=successes:
+             betaBinomial.getPosteriorsFromEvents(ids, s, (1, 1))),
+            ('betaBinomial.getStoppingK', params,
+             lambda n=n: betaBinomial.getStoppingK(n, 2*n, 0.6, 0.5)),
+            ('normalNormal.getLikelihoods', params,
+             lambda p=p: normalNormal.getLikelihoods(p, 1, p - 1, p + 1)),
+            ('normalNormal.getPosteriors', params,
+             lambda p=p, n=n: normalNormal.getPosteriors(p*n, n, 1, 0, 1,
+                                                         ci=95)),
+            ('varianceWithFormulaArray', params,
+             lambda g=groups, w=weights:
+             varianceWithFormulaArray(g, g*10, w)),
+            ('getTestStatsArray', params,
+             lambda p=p: getTestStatsArray(p[:, None], p[::-1, None],
+                                           [0, 0.01, 0.1, 1])),
+            ('bayesRuleArray', params,
+             lambda h=hypotheses, w=weights: bayesRuleArray(w, h)),
+            ('bayesRuleArray.log', params,
+             lambda h=hypotheses, w=weights:
+             bayesRuleArray(np.log(w), np.log(h), log=True)),
+            ('BayesianUpdater.updateMany', params,
+             lambda ids=ids, lk=likelihoods:
+             BayesianUpdater([0.5, 0.5]).updateMany(ids, lk)),
+            ('Accumulator.update', params,
+             lambda p=p: Accumulator(iter(p.tolist())))
+        ]
+
+    return cases
+
+
+def getCases(sizes, tmpdir):
+    '''
+    Builds the benchmark cases. Inputs are generated here, outside of the
+    timed calls.
+
+    Returns:
+    --------
+    list of (case name, parameters, function without arguments) tuples.
+    '''
+    return (naiveCases(sizes, tmpdir) + discreteCases(sizes)
+            + toolCases(sizes) + arrayCases(sizes))
+
+
+def measure(function, repeat=3):
+    '''
+    Best time (seconds) over 'repeat' calls, then peak memory (KB) traced
+    with tracemalloc in 1 extra call (tracing slows the call down). A
+    first untimed call keeps one-off costs (imports on first use, such as
+    scipy) out of the results.
+    '''
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return min(times), peak/1024
+
+
+def caseKey(name, params):
+    return name + '[' + ','.join(f'{k}={v}' for k, v in params.items()) + ']'
+
+
+def runSuite(sizes='quick', repeat=3, only=''):
+    '''
+    Runs every case (or those whose key contains 'only'). Printing is
+    turned off (see 'helpers.setQuiet') so only computation is measured.
+
+    Returns:
+    --------
+    dictionary: {case key: {'case', 'params', 'seconds', 'peak_kb'}}.
+    '''
+    setQuiet()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, params, function in getCases(SIZES[sizes], tmpdir):
+            key = caseKey(name, params)
+            if only not in key:
+                continue
+            seconds, peak = measure(function, repeat)
+            results[key] = {'case': name, 'params': params,
+                            'seconds': round(seconds, 6),
+                            'peak_kb': round(peak, 1)}
+
+    return results
+
+
+def compare(results, baseline, threshold=0.25):
+    '''
+    Cases slower or using more memory than in 'baseline' by more than
+    'threshold' (fraction). Cases missing from either side are ignored.
+
+    Returns:
+    --------
+    list of (case key, metric, baseline value, new value) tuples.
+    '''
+    regressions = []
+    limits = (('seconds', MIN_SECONDS), ('peak_kb', MIN_PEAK_KB))
+    for key in results.keys() & baseline.keys():
+        for metric, noise in limits:
+            old, new = baseline[key][metric], results[key][metric]
+            if new > old*(1 + threshold) and new - old > noise:
+                regressions.append((key, metric, old, new))
+
+    return sorted(regressions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', choices=sorted(SIZES), default='quick')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', default='',
+                        help='run only cases whose name contains this text')
+    parser.add_argument('--output', help='save results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed growth of time and peak memory')
+    args = parser.parse_args(argv)
+
+    results = runSuite(args.sizes, args.repeat, args.only)
+    for key, result in results.items():
+        print(f"{key}: {result['seconds']*1000:.2f} ms, "
+              f"{result['peak_kb']:.0f} KB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as ofile:
+            json.dump({'python': platform.python_version(),
+                       'sizes': args.sizes, 'results': results},
+                      ofile, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as ofile:
+        baseline = json.load(ofile)['results']
+
+    regressions = compare(results, baseline, args.threshold)
+    for key, metric, old, new in regressions:
+        print(f'REGRESSION {key} {metric}: {old} -> {new}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
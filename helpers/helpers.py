@@ -1,6 +1,77 @@
 import operator
 from functools import reduce
 import csv
+import itertools as it
+
+
+# when True, results are returned without being printed (see 'setQuiet')
+QUIET = False
+
+
+def setQuiet(quiet=True):
+    '''
+    Global quiet mode: functions returning 'Result' objects stop printing
+    them, so no display string is ever built unless requested with
+    'to_table()' or 'show()'.
+    '''
+    global QUIET
+    QUIET = quiet
+
+
+def isQuiet():
+    return QUIET
+
+
+class _Rendered:
+    '''
+    Display of a result, only built when requested with 'to_table()' or
+    'show()'. repr and str stay those of the plain values.
+    '''
+    def to_table(self):
+        '''Builds the display string of the result.'''
+        return self._render() if self._render else repr(self)
+
+    def show(self):
+        print(self.to_table())
+
+
+class Result(_Rendered, tuple):
+    '''
+    Tuple of computed values (unpacked like the plain tuples functions
+    used to return) with a lazy display.
+
+    Parameters:
+    -----------
+    values: computed values.
+    render: function without arguments returning the display string.
+    '''
+    def __new__(cls, values, render=None):
+        result = super().__new__(cls, values)
+        result._render = render
+        return result
+
+    def __reduce__(self):
+        # the display is not pickled (render functions are often lambdas)
+        return (type(self), (tuple(self), ))
+
+
+class ScalarResult(_Rendered, float):
+    '''Same as 'Result' for a single number (behaves as a float).'''
+
+    def __new__(cls, value, render=None):
+        result = super().__new__(cls, value)
+        result._render = render
+        return result
+
+    def __reduce__(self):
+        return (type(self), (float(self), ))
+
+
+def report(result, verbose=True):
+    '''Prints 'result' unless 'verbose' is False or quiet mode is on.'''
+    if verbose and not QUIET:
+        result.show()
+    return result
 
 
 def multiply(tp: tuple or list):
@@ -53,3 +124,16 @@ def csvAsDicts(path):
 
     with open(path, 'r', newline='', encoding='utf-8') as ofile:
         return list(csv.DictReader(ofile))
+
+
+def csvChunks(path, chunksize=100000):
+    '''
+    Reads a CSV file in chunks. Yields lists of dictionaries (1 per row)
+    with at most 'chunksize' rows so the whole file is never in memory.
+    '''
+    with open(path, 'r', newline='', encoding='utf-8') as ofile:
+        reader = csv.DictReader(ofile)
+        chunk = list(it.islice(reader, chunksize))
+        while chunk:
+            yield chunk
+            chunk = list(it.islice(reader, chunksize))
@@ -0,0 +1,77 @@
+import itertools as it
+
+
+class Accumulator:
+    '''
+    Sufficient statistics of a stream of observations: count, sum and
+    sum of squared deviations from the mean. Only these 3 numbers are kept,
+    so observations can be passed in chunks (lists, arrays or iterables of
+    any size) and accumulators from different workers can be merged.
+
+    Formulas (merging groups a and b):
+        count = count_a + count_b
+        sum = sum_a + sum_b
+        squared deviations = sq_a + sq_b + (mean_b - mean_a)^2 * count_a *
+                                           count_b / count
+
+    Parameters:
+    -----------
+    observations: first chunk of observations (optional).
+    '''
+    # number of observations read at once from iterables
+    chunksize = 100000
+
+    def __init__(self, observations=()):
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.update(observations)
+
+    @property
+    def mean(self):
+        return self.total/self.count if self.count else 0.0
+
+    def update(self, observations):
+        '''Adds a chunk (list, array or iterable) of observations.'''
+        # numpy is only needed for chunk sums: keeps the models cheap to import
+        import numpy as np
+
+        if isinstance(observations, (list, tuple, np.ndarray)):
+            self._addChunk(np.asarray(observations, dtype=float))
+            return self
+
+        iterator = iter(observations)
+        chunk = np.fromiter(it.islice(iterator, self.chunksize), dtype=float)
+        while len(chunk):
+            self._addChunk(chunk)
+            chunk = np.fromiter(it.islice(iterator, self.chunksize),
+                                dtype=float)
+        return self
+
+    def _addChunk(self, chunk):
+        '''Merges the statistics of 1 array of observations.'''
+        if not len(chunk):
+            return
+        # chunk is a numpy array (see 'update')
+        other = Accumulator()
+        other.count = len(chunk)
+        other.total = float(chunk.sum())
+        other.squares = float(((chunk - other.mean)**2).sum())
+        self.merge(other)
+
+    def merge(self, other):
+        '''Adds the statistics of another accumulator (in place).'''
+        if not other.count:
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.squares += (other.squares
+                         + delta**2 * self.count * other.count / count)
+        self.total += other.total
+        self.count = count
+        return self
+
+    def squaredDeviations(self, center):
+        '''Sum of squared deviations from 'center': sum((x - center)^2).'''
+        return self.squares + self.count*(self.mean - center)**2
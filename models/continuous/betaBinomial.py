@@ -1,4 +1,5 @@
-from tabulate import tabulate
+import numpy as np
+from neoBayesian.helpers.helpers import Result, report
 
 
 def getMeanVarOrAlphaBeta(mean=0, variance=0, alpha=0, beta=0):
@@ -42,24 +43,173 @@ def getPosterior(N:int, k:int, alphabeta_tuple:tuple, verbose=True):
     N - sample size.
     k - number of successful events.
     alphabeta_tuple - prior alpha and beta parameters.
+    verbose - print the posterior (unless quiet mode is on).
+
+    Returns:
+    --------
+    Result: (alpha_, beta_, expected value, variance).
     '''
     alpha_ = alphabeta_tuple[0] + k
     beta_ = alphabeta_tuple[1] + (N - k)
     exp =  (alpha_/(alpha_+beta_))
     var = (alpha_ * beta_) / ((alpha_+beta_+1) * (alpha_+beta_)**2)
 
-    if verbose:
-        print(f'N: {N}, k: {k}')
-        print('\nPosterior:')
-        print(f'\talpha-> {round(alpha_, 3)}',
-              f'\n\tbeta-> {round(beta_, 3)},',
-              f'\n\texpected-> {round(exp, 3)}',
-              f'\n\tvariance-> {round(var, 3)}.\n')
+    render = lambda: '\n'.join([
+        f'N: {N}, k: {k}',
+        '\nPosterior:',
+        f'\talpha-> {round(alpha_, 3)} '
+        f'\n\tbeta-> {round(beta_, 3)}, '
+        f'\n\texpected-> {round(exp, 3)} '
+        f'\n\tvariance-> {round(var, 3)}.\n'
+    ])
+
+    return report(Result((alpha_, beta_, exp, var), render), verbose)
+
+
+def getPosteriors(N, k, alphas, betas):
+    '''
+    Vectorized 'getPosterior' for many arms (variants) at once. Nothing is
+    printed. Arguments can be numbers or arrays (broadcast together).
+
+    Parameters:
+    -----------
+    N - array of sample sizes.
+    k - array of number of successful events.
+    alphas - array of prior alpha parameters.
+    betas - array of prior beta parameters.
+
+    Returns:
+    --------
+    Tuple of arrays: (alpha_, beta_, expected value, variance).
+    '''
+    N, k = np.asarray(N), np.asarray(k)
+    alpha_ = np.asarray(alphas) + k
+    beta_ = np.asarray(betas) + (N - k)
+    exp = alpha_/(alpha_+beta_)
+    var = (alpha_ * beta_) / ((alpha_+beta_+1) * (alpha_+beta_)**2)
 
     return (alpha_, beta_, exp, var)
 
 
-def iterOverK(priors: tuple, true_p: float, cutoff: float, k=1, acc=[]):
+def countEvents(variant_ids, successes):
+    '''
+    Aggregates an event stream (1 event per element) into the sample size
+    and number of successful events per variant.
+
+    Parameters:
+    -----------
+    variant_ids - array of variant ids, 1 per event.
+    successes - array of 1 (success) or 0 (failure), 1 per event.
+
+    Returns:
+    --------
+    Tuple of arrays: (sorted unique variants, N, k).
+    '''
+    variants, inverse = np.unique(variant_ids, return_inverse=True)
+    N = np.bincount(inverse, minlength=len(variants))
+    k = np.bincount(inverse, weights=np.asarray(successes, dtype=float),
+                    minlength=len(variants))
+
+    return (variants, N, k)
+
+
+def getPosteriorsFromEvents(variant_ids, successes, alphabeta_tuple):
+    '''
+    Aggregates an event stream per variant (see 'countEvents') and updates
+    the priors of each variant (see 'getPosteriors').
+
+    Parameters:
+    -----------
+    variant_ids - array of variant ids, 1 per event.
+    successes - array of 1 (success) or 0 (failure), 1 per event.
+    alphabeta_tuple - prior alpha and beta parameters: numbers or arrays
+                      in the order of the sorted unique variants.
+
+    Returns:
+    --------
+    Tuple: (sorted unique variants, alpha_, beta_, expected, variance).
+    '''
+    variants, N, k = countEvents(variant_ids, successes)
+    return (variants,) + getPosteriors(N, k, *alphabeta_tuple)
+
+
+def _trajectoryParams(alphas, betas, true_p, k_start, k):
+    '''
+    Posterior alpha and beta of 'iterOverK' after reaching 'k'. Each step
+    passes its posterior on as the prior of the next one, adding 'i' successes
+    and 'i/true_p' trials for every i from 'k_start' to 'k':
+        alpha = alpha0 + S
+        beta = beta0 + S/true_p - S
+        S = k_start + ... + k = (k*(k+1) - (k_start-1)*k_start)/2
+    '''
+    S = (k*(k+1) - (k_start-1)*k_start)/2
+    return (alphas + S, betas + S/true_p - S)
+
+
+def getStoppingK(alphas, betas, true_p, cutoff, k=1):
+    '''
+    Non-recursive, vectorized version of the search in 'iterOverK'. Solves
+    for the first number of successful events where the expected value is
+    >= cutoff. Formula (see '_trajectoryParams'):
+
+        E = (alpha0 + S) / (alpha0 + beta0 + S/true_p) >= cutoff
+        S >= (cutoff * (alpha0 + beta0) - alpha0) / (1 - cutoff/true_p)
+
+    E only gets closer to 'true_p' as S grows, so the cutoff is never
+    reached (inf is returned) when it lies beyond 'true_p'.
+
+    Parameters:
+    -----------
+    alphas, betas - arrays (or numbers) of starting alpha and beta.
+    true_p - array of observed probabilities.
+    cutoff - array of expected values to stop.
+    k - starting number of successful events.
+
+    Returns:
+    --------
+    array of the stopping number of successful events (float, inf if
+    never reached).
+    '''
+    alphas, betas, true_p, cutoff = np.broadcast_arrays(
+        *map(lambda v: np.asarray(v, dtype=float),
+             (alphas, betas, true_p, cutoff)))
+
+    def getExp(kk):
+        a, b = _trajectoryParams(alphas, betas, true_p, k, kk)
+        return a/(a+b)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        minS = (cutoff*(alphas+betas) - alphas)/(1 - cutoff/true_p)
+        # smallest kk with kk*(kk+1)/2 >= minS + (k-1)*k/2
+        T = np.maximum(minS + (k-1)*k/2, 0)
+        kk = np.maximum(np.ceil((np.sqrt(1 + 8*T) - 1)/2), k)
+
+    # bounded search around the closed form (floating point rounding)
+    reachable = cutoff < true_p
+    kk = np.where(reachable & ~np.isfinite(kk), k, kk)
+    for _ in range(2):
+        kk = np.where(reachable & (getExp(kk) < cutoff), kk+1, kk)
+        kk = np.where((kk > k) & (getExp(kk-1) >= cutoff), kk-1, kk)
+
+    stops = getExp(np.full(alphas.shape, float(k))) >= cutoff
+    return np.where(stops, k, np.where(reachable, kk, np.inf))
+
+
+def getTrajectory(priors: tuple, true_p: float, k_start: int, k_stop: int):
+    '''
+    Rows of 'iterOverK' from 'k_start' to 'k_stop' (inclusive):
+    (N, k, Alpha, Beta, Expected, Variance).
+    '''
+    k = np.arange(k_start, k_stop+1)
+    a, b = _trajectoryParams(priors[0], priors[1], true_p, k_start, k)
+    exp = a/(a+b)
+    var = (a * b) / ((a+b+1) * (a+b)**2)
+
+    return list(zip((k/true_p).tolist(), k.tolist(), a.tolist(),
+                    b.tolist(), exp.tolist(), var.tolist()))
+
+
+def iterOverK(priors: tuple, true_p: float, cutoff: float, k=1):
     '''
     Calculates expected values (0 t0 100%) of a beta distribution
     increasing the number of successful events by one and
@@ -69,6 +219,8 @@ def iterOverK(priors: tuple, true_p: float, cutoff: float, k=1, acc=[]):
     REMEMBER: given a true probability 'p', EXP value will never equals 'p'
     so the cutoff must be always less than 'true_p'.
 
+    The stopping 'k' is solved directly (see 'getStoppingK').
+
     Parameters:
     -----------
     priors - starting alpha and beta tuple.
@@ -76,13 +228,23 @@ def iterOverK(priors: tuple, true_p: float, cutoff: float, k=1, acc=[]):
              over each function call.
     cutoff - expected value to stop recursion.
     k - starting number of successful events.
+
+    Returns:
+    --------
+    Result: 1 (N, k, Alpha, Beta, Expected, Variance) row per step (empty
+    when the cutoff is never reached), printed unless quiet mode is on.
     '''
-    a, b, exp, var = getPosterior(k/true_p, k, priors, verbose=False)
-    tp = (k/true_p, k, a, b, exp, var)
+    k_stop = getStoppingK(priors[0], priors[1], true_p, cutoff, k)
+    if not np.isfinite(k_stop):
+        render = lambda: f'Expected value never reaches {cutoff}.'
+        return report(Result((), render))
+
+    rows = getTrajectory(priors, true_p, k, int(k_stop))
+
+    def render():
+        from tabulate import tabulate
 
-    if exp >= cutoff:
         headers=['N', 'k', 'Alpha', 'Beta', 'Expected', 'Variance']
-        print(tabulate(acc+[tp], headers=headers))
-        return
-    else:
-        iterOverK((a, b), true_p, cutoff, k+1, acc + [tp])
+        return tabulate(rows, headers=headers)
+
+    return report(Result(rows, render))
@@ -3,6 +3,9 @@ Parameterization:
 -----------------
 a = alpha = theta + 1
 '''
+from neoBayesian.models.continuous.accumulator import Accumulator
+
+
 def getMeanVarOrThetaBeta(mean=0, variance=0, theta=0, beta=0):
     '''
     Finds parameters theta and beta or mean and variance.
@@ -26,11 +29,35 @@ def getMeanVarOrThetaBeta(mean=0, variance=0, theta=0, beta=0):
         return (mean, variance)
 
 
-def getPosterior(beta, theta, observations: list):
-    '''Calculates posterior beta, theta, expected value, and variance.'''
-    beta_ = beta + len(observations)
-    theta_ = theta + sum(observations)
+def getPosteriorFromStats(beta, theta, count, total):
+    '''
+    Calculates posterior beta, theta, expected value, and variance from
+    the number of observations 'count' and their sum 'total'.
+    '''
+    beta_ = beta + count
+    theta_ = theta + total
     exp =  (theta_ + 1) / beta_
     var = (theta_ + 1) / beta_**2
 
     return (beta_, theta_, exp, var)
+
+
+def getPosterior(beta, theta, observations: list):
+    '''Calculates posterior beta, theta, expected value, and variance.'''
+    return getPosteriorFromStats(beta, theta, len(observations),
+                                 sum(observations))
+
+
+class GammaPoissonAccumulator(Accumulator):
+    '''
+    Streaming version of 'getPosterior': keeps the prior parameters and the
+    sufficient statistics of the observations (see 'Accumulator').
+    '''
+    def __init__(self, beta, theta, observations=()):
+        self.beta, self.theta = beta, theta
+        super().__init__(observations)
+
+    def getPosterior(self):
+        '''Calculates posterior beta, theta, expected value, and variance.'''
+        return getPosteriorFromStats(self.beta, self.theta, self.count,
+                                     self.total)
@@ -4,6 +4,9 @@ Parameterization:
 a = alpha = t(tau) + 1 = s/2 - 1
 B = beta = r/2
 '''
+from neoBayesian.models.continuous.accumulator import Accumulator
+
+
 def getMeanVarOrSR(mean=0, variance=0, r=0, s=0):
     '''
     Finds parameters r and s or mean and variance. Formulas:
@@ -34,11 +37,36 @@ def getMeanVarOrSR(mean=0, variance=0, r=0, s=0):
         return (mean, variance)
 
 
-def getPosterior(known_mean, observations: list, rs_tuple:tuple):
-    '''Calculates posterior r, s, expected value, and variance.'''
-    r_ = rs_tuple[0] + sum(map(lambda v: (v - known_mean)**2, observations))
-    s_ = rs_tuple[1] + len(observations)
+def getPosteriorFromStats(squared_deviations, count, rs_tuple:tuple):
+    '''
+    Calculates posterior r, s, expected value, and variance from the sum of
+    squared deviations from the known mean and the number of observations.
+    '''
+    r_ = rs_tuple[0] + squared_deviations
+    s_ = rs_tuple[1] + count
     exp = r_ / (s_ - 4)
     var = (2 * r_**2) / ((s_ - 4)**2 * (s_ - 6))
 
     return (r_, s_, exp, var)
+
+
+def getPosterior(known_mean, observations: list, rs_tuple:tuple):
+    '''Calculates posterior r, s, expected value, and variance.'''
+    squared = sum(map(lambda v: (v - known_mean)**2, observations))
+    return getPosteriorFromStats(squared, len(observations), rs_tuple)
+
+
+class NormalInverseGammaAccumulator(Accumulator):
+    '''
+    Streaming version of 'getPosterior': keeps the known mean, the prior
+    parameters and the sufficient statistics of the observations (see
+    'Accumulator').
+    '''
+    def __init__(self, known_mean, rs_tuple:tuple, observations=()):
+        self.known_mean, self.rs_tuple = known_mean, rs_tuple
+        super().__init__(observations)
+
+    def getPosterior(self):
+        '''Calculates posterior r, s, expected value, and variance.'''
+        squared = self.squaredDeviations(self.known_mean)
+        return getPosteriorFromStats(squared, self.count, self.rs_tuple)
@@ -1,4 +1,26 @@
-from scipy.stats import norm
+from functools import lru_cache
+
+import numpy as np
+
+from neoBayesian.models.continuous.accumulator import Accumulator
+
+
+# rounded z-scores of the usual confidence levels
+ZSCORES = {80:1.282, 85:1.440, 90:1.645, 95:1.960, 99:2.576, 99.5:2.807}
+
+
+@lru_cache(maxsize=None)
+def getZScore(perct):
+    '''
+    Z-score of a two-sided confidence level 'perct' (percentage). Uses the
+    ZSCORES table and, for any other level, norm.ppf (memoized).
+    '''
+    if perct in ZSCORES:
+        return ZSCORES[perct]
+
+    from scipy.stats import norm
+
+    return float(norm.ppf(0.5 + perct/200))
 
 
 def getParamsFromInterval(interval: tuple, perct):
@@ -11,11 +33,8 @@ def getParamsFromInterval(interval: tuple, perct):
     interval: lower and upper boundaries.
     percentage: percentage contained within boundaries.
     '''
-    zscores = {80:1.282, 85:1.440, 90:1.645, 95:1.960,
-               99:2.576, 99.5:2.807}
-
     mean = sum(interval)/2
-    std = (interval[1] - interval[0]) / (2*zscores[perct])
+    std = (interval[1] - interval[0]) / (2*getZScore(perct))
 
     return (mean, std**2)
 
@@ -29,6 +48,8 @@ def getLikelihood(distParams: tuple, distRange: tuple):
     distParams: mean and variance.
     distRange: upper and lower limits for CDF.
     '''
+    from scipy.stats import norm
+
     mean, variance = distParams
 
     return (norm.cdf(distRange[1], loc=mean, scale=variance**0.5)
@@ -51,25 +72,118 @@ def getPosterior(x: list or int, sample_v, prior_m, prior_v, ci=0):
     sample_v - variance of the sample.
     prior_m - prior mean.
     prior_v - prior variance.
-    ci - confidence interval. If used, pass the number needed in the
-         zscores dictionary.
+    ci - confidence interval (percentage, see 'getZScore').
     '''
     x = x if isinstance(x, list) else [x]
 
-    mean = (((prior_m*sample_v) + (sum(x)*prior_v)) /
-            (sample_v + len(x)*prior_v)
+    return getPosteriorFromStats(sum(x), len(x), sample_v, prior_m, prior_v,
+                                 ci)
+
+
+def getPosteriorFromStats(total, count, sample_v, prior_m, prior_v, ci=0):
+    '''
+    Calculates the posterior parameters (mean and variance) of a normal
+    distribution from the sum of the observations 'total' and their number
+    'count' (see 'getPosterior').
+    '''
+    mean = (((prior_m*sample_v) + (total*prior_v)) /
+            (sample_v + count*prior_v)
     )
     variance = ((sample_v * prior_v) /
-                (sample_v + len(x)*prior_v)
+                (sample_v + count*prior_v)
     )
 
     if prior_m == 0 and prior_v == 0:
-        mean = sum(x)/len(x)
-        variance = sample_v/len(x)
+        mean = total/count
+        variance = sample_v/count
 
-    zscores = {80:1.282, 85:1.440, 90:1.645, 95:1.960, 99:2.576, 99.5:2.807}
     if ci:
-        lower = round(mean - zscores[ci]*(variance**0.5), 3)
-        upper = round(mean + zscores[ci]*(variance**0.5), 3)
+        lower = round(mean - getZScore(ci)*(variance**0.5), 3)
+        upper = round(mean + getZScore(ci)*(variance**0.5), 3)
 
     return (mean, variance) if not ci else (mean, variance, (lower, upper))
+
+
+# Array versions ***********************************************************
+# Parameters accept numbers or NumPy arrays (1 element per group) and are
+# broadcast together.
+
+def getParamsFromIntervals(lowers, uppers, perct):
+    '''
+    Array version of 'getParamsFromInterval'.
+
+    Returns:
+    --------
+    Tuple of arrays: (means, variances).
+    '''
+    lowers, uppers = np.asarray(lowers), np.asarray(uppers)
+    std = (uppers - lowers) / (2*getZScore(perct))
+
+    return ((lowers + uppers)/2, std**2)
+
+
+def getLikelihoods(means, variances, lowers, uppers):
+    '''
+    Array version of 'getLikelihood': both CDF limits of every group are
+    evaluated in a single norm.cdf call.
+    '''
+    from scipy.stats import norm
+
+    uppers, lowers, means, variances = np.broadcast_arrays(
+        uppers, lowers, means, variances)
+    cdf = norm.cdf(np.stack([uppers, lowers]), loc=means,
+                   scale=np.sqrt(variances))
+    return cdf[0] - cdf[1]
+
+
+def getPosteriors(totals, counts, sample_v, prior_m, prior_v, ci=0):
+    '''
+    Array version of 'getPosteriorFromStats' for many groups at once.
+    Groups with 'prior_m' and 'prior_v' equal to 0 use non-informative
+    priors. Confidence bounds are not rounded.
+
+    Parameters:
+    -----------
+    totals - array of sums of the observations.
+    counts - array of number of observations.
+    sample_v, prior_m, prior_v - arrays (see 'getPosterior').
+    ci - confidence interval (percentage, see 'getZScore').
+
+    Returns:
+    --------
+    Tuple of arrays: (means, variances) or (means, variances, lowers, uppers)
+    if 'ci' is passed.
+    '''
+    totals, counts, sample_v, prior_m, prior_v = map(
+        np.asarray, (totals, counts, sample_v, prior_m, prior_v))
+
+    uniform = (prior_m == 0) & (prior_v == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(uniform, totals/counts,
+                        ((prior_m*sample_v) + (totals*prior_v)) /
+                        (sample_v + counts*prior_v))
+        variance = np.where(uniform, sample_v/counts,
+                            (sample_v * prior_v) /
+                            (sample_v + counts*prior_v))
+
+    if not ci:
+        return (mean, variance)
+
+    margin = getZScore(ci)*np.sqrt(variance)
+    return (mean, variance, mean - margin, mean + margin)
+
+
+class NormalNormalAccumulator(Accumulator):
+    '''
+    Streaming version of 'getPosterior': keeps the sample variance, the
+    prior parameters and the sufficient statistics of the observations
+    (see 'Accumulator').
+    '''
+    def __init__(self, sample_v, prior_m, prior_v, observations=()):
+        self.sample_v, self.prior_m, self.prior_v = sample_v, prior_m, prior_v
+        super().__init__(observations)
+
+    def getPosterior(self, ci=0):
+        '''Calculates the posterior mean and variance (see 'getPosterior').'''
+        return getPosteriorFromStats(self.total, self.count, self.sample_v,
+                                     self.prior_m, self.prior_v, ci)
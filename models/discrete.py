@@ -1,5 +1,8 @@
 import math
 
+import numpy as np
+from neoBayesian.helpers.helpers import isQuiet
+
 
 def UniformDist(first: int, last: int , steps: int, mode='pdf', verbose='no'):
     '''
@@ -12,16 +15,22 @@ def UniformDist(first: int, last: int , steps: int, mode='pdf', verbose='no'):
     last: last value in sequence (inclusive).
     steps: steps of the sequence.
     mode: 'pdf' (default), 'var', 'exp', or integer 'k' to compute CDF.
-    verbose: print statistics.
+    verbose: print statistics (unless quiet mode is on).
     '''
-    my_list = list(range(first, last+1, steps))
+    # range objects give length, values, membership and index in O(1)
+    sequence = range(first, last+1, steps)
+    length = len(sequence)
 
-    p = 1/len(my_list)
-    mean = (my_list[0]+my_list[-1])/2
-    mean_squared = sum(map(lambda val: p*(val**2), my_list))
+    p = 1/length
+    mean = (sequence[0]+sequence[-1])/2
+    # sum of squares of the arithmetic sequence in closed form
+    a, d = sequence[0], steps
+    squares = (length*a**2 + a*d*length*(length-1)
+               + d**2*((length-1)*length*(2*length-1)//6))
+    mean_squared = squares/length
 
-    if verbose == 'yes':
-        print(f'Length: {len(my_list)}')
+    if verbose == 'yes' and not isQuiet():
+        print(f'Length: {length}')
         print(f'Mean: {mean}')
         print(f'Mean**2: {mean_squared}')
         print(f'Variance: {mean_squared - mean**2}\n')
@@ -34,16 +43,78 @@ def UniformDist(first: int, last: int , steps: int, mode='pdf', verbose='no'):
     if mode == 'exp':
         return mean
     if isinstance(mode, int):
-        return (1/p*(my_list.index(mode)+1)
-                if mode in my_list else
+        return (1/p*(sequence.index(mode)+1)
+                if mode in sequence else
                 print(f"{mode} not in sequence. Can't compute CDF.")
         )
 
 
-def BinomialDist(n: int, k: int, p: float, mode='pdf', results=[]):
+# largest 'n' for which probabilities are computed with exact integers
+EXACT_N = 1000
+
+
+def _binomialPmf(n, k, p):
+    '''
+    Pr(X=k) of a Binomial distribution. Uses the exact binomial coefficient
+    up to EXACT_N trials and log space (lgamma) above it to avoid overflow.
+    '''
+    if k < 0 or k > n:
+        return 0.0
+    if p in (0, 1):
+        return float(k == (0 if p == 0 else n))
+    if n <= EXACT_N:
+        return math.comb(n, k)*((p**k)*((1-p)**(n-k)))
+
+    return math.exp(math.lgamma(n+1) - math.lgamma(k+1) - math.lgamma(n-k+1)
+                    + k*math.log(p) + (n-k)*math.log1p(-p))
+
+
+def _poissonPmf(u, k):
+    '''
+    Pr(X=k) of a Poisson distribution. Falls back to log space when the
+    direct formula overflows or underflows.
+    '''
+    if u == 0:
+        # all probability at k = 0 (log(0) is undefined)
+        return float(k == 0)
+    if u <= 700 and k <= 170:
+        try:
+            return ((math.e**(-u))*(u**k))/math.factorial(k)
+        except OverflowError:
+            pass
+    return math.exp(k*math.log(u) - u - math.lgamma(k+1))
+
+
+def _sumFromMode(pmf, lower, upper, mode):
+    '''
+    Adds pmf(i) for i in [lower, upper] (inclusive) for a unimodal
+    distribution. Starts at the mode and moves outwards until probabilities
+    underflow to 0, so only the terms that matter are visited.
+    '''
+    start = min(max(mode, lower), upper)
+    total = 0.0
+    for i in range(start, lower-1, -1):
+        proba = pmf(i)
+        if proba == 0 and i < mode:
+            break
+        total += proba
+    for i in range(start+1, upper+1):
+        proba = pmf(i)
+        if proba == 0 and i > mode:
+            break
+        total += proba
+
+    # lgamma rounding (large 'n') can push the sum slightly above 1
+    return min(total, 1.0)
+
+
+def BinomialDist(n: int, k: int, p: float, mode='pdf'):
     '''
     Calculates probability of exactly 'k' successes in 'n' observations.
 
+    'cdf' adds the probabilities in a loop (constant memory) skipping the
+    tails that underflow to 0.
+
     Parameters:
     -----------
     n - number of trials.
@@ -52,23 +123,20 @@ def BinomialDist(n: int, k: int, p: float, mode='pdf', results=[]):
     mode - 'pdf' (default), 'exp', 'var', or
         'cdf' (adds all probabilities from 0 to k).
     '''
-    if k < 0 and mode == 'cdf':
-        return sum(results)
-
-    f1 = math.factorial(n)/(math.factorial(k)*math.factorial(n-k))
-    f2 = (p**k)*((1-p)**(n-k))
-
     if mode == 'pdf':
-        return f1*f2
+        return _binomialPmf(n, k, p)
     if mode == 'var':
         return (n*p)*(1-p)
     if mode == 'exp':
         return n*p
     if mode == 'cdf':
-        return BinomialDist(n, k-1, p, mode, results+[f1*f2])
+        if k < 0:
+            return 0
+        pmf = lambda i: _binomialPmf(n, i, p)
+        return _sumFromMode(pmf, 0, min(k, n), math.floor((n+1)*p))
 
 
-def PoissonDist(u, lower_k, upper_k='', results=[]):
+def PoissonDist(u, lower_k, upper_k=''):
     '''
     Calculates probability of 'n' number of independent events
     in a fixed time. Expected value and Variance equals 'u'.
@@ -77,28 +145,30 @@ def PoissonDist(u, lower_k, upper_k='', results=[]):
                       -----------------
                              x!
 
+    Probabilities up to 'upper_k' are added in a loop (constant memory)
+    skipping the tails that underflow to 0.
+
     Parameters:
     -----------
     u - mean number of successes in the given time interval or region.
     lower_k - number of successes occurring in a given time interval.
     upper_k - if passed, probabilities are added up to [upper_k] (inclusive).
     '''
-    if upper_k and (lower_k > upper_k):
-        return sum(results)
-
-    result = ((math.e**(-u))*(u**lower_k))/math.factorial(lower_k)
-
     if not upper_k:
-        return result
+        return _poissonPmf(u, lower_k)
 
-    return PoissonDist(u, lower_k+1, upper_k, results+[result])
+    if lower_k > upper_k:
+        return 0
+    pmf = lambda k: _poissonPmf(u, k)
+    return _sumFromMode(pmf, lower_k, upper_k, math.floor(u))
 
 
-def GeometricDist(p, k, mode='pdf', results=[]):
+def GeometricDist(p, k, mode='pdf'):
     '''
     Calculates the probability of failing 'k' number of times until
     the first success occurs: P(X=k). Mode 'cdf' will calculate all
-    probabilities from 0 to 'k' (inclusive) and add them up.
+    probabilities from 0 to 'k' (inclusive) and add them up (computed
+    with the closed form below).
     Formulas:
         cdf = 1 - (1 - p)**(k + 1)
         survival f = (1 - p)**(k + 1)
@@ -109,20 +179,18 @@ def GeometricDist(p, k, mode='pdf', results=[]):
     k - independent trials until first success.
     mode - 'exp', 'var', 'cdf' or 'pdf' (by default).
     '''
-    if k < 0 and mode == 'cdf':
-        return sum(results)
-
-    result = ((1-p)**k)*p
-
     if mode == 'pdf':
-        return result
+        return ((1-p)**k)*p
     if mode == 'var':
         return (1-p)/(p**2)
     if mode == 'exp':
         return (1-p)/p
 
     # else if mode == 'cdf'
-    return GeometricDist(p, k-1, mode, results+[result])
+    if k < 0:
+        return 0
+    # 1 - (1-p)**(k+1) without losing precision for small 'p'
+    return -math.expm1((k+1)*math.log1p(-p)) if p < 1 else 1.0
 
 
 def GeometricDistParams(p='', expected_value=''):
@@ -136,3 +204,135 @@ def GeometricDistParams(p='', expected_value=''):
             if p and not expected_value else
             print('Enter correct arguments.')
            )
+
+
+# Array versions ***********************************************************
+# Parameters accept numbers or NumPy arrays and are broadcast together, so a
+# whole grid of parameters is evaluated in one call.
+
+def UniformDistArray(first, last, steps, mode='pdf'):
+    '''
+    Array version of 'UniformDist' computed in closed form from the
+    arithmetic sequence (first, first + steps, ..., last).
+
+    Parameters:
+    -----------
+    first, last, steps: arrays (or numbers) defining the sequences.
+    mode: 'pdf' (default), 'var', 'exp', or array of integers 'k' to
+          compute CDF: (index of 'k' + 1)/length. NaN where 'k' is not in
+          the sequence.
+    '''
+    first, last, steps = map(np.asarray, (first, last, steps))
+    length = (last - first)//steps + 1
+    lastValue = first + (length - 1)*steps
+
+    if isinstance(mode, str):
+        if mode == 'pdf':
+            return 1/length
+        if mode == 'exp':
+            return (first + lastValue)/2
+        if mode == 'var':
+            # float powers: int64 overflows for wide ranges
+            steps, length = steps.astype(float), length.astype(float)
+            return steps**2*(length**2 - 1)/12
+
+    k = np.asarray(mode)
+    index, remainder = np.divmod(k - first, steps)
+    inSequence = (remainder == 0) & (index >= 0) & (index < length)
+    return np.where(inSequence, (index + 1)/length, np.nan)
+
+
+def BinomialDistArray(n, k, p, mode='pdf'):
+    '''
+    Array version of 'BinomialDist'.
+
+    Parameters:
+    -----------
+    n - array of number of trials.
+    k - array of number of successful trials.
+    p - array of probabilities of success of single event.
+    mode - 'pdf' (default), 'exp', 'var', or
+        'cdf' (adds all probabilities from 0 to k).
+    '''
+    from scipy import stats
+
+    if mode == 'pdf':
+        return stats.binom.pmf(k, n, p)
+    if mode == 'cdf':
+        return stats.binom.cdf(k, n, p)
+
+    n, p = np.asarray(n), np.asarray(p)
+    if mode == 'var':
+        return (n*p)*(1-p)
+    if mode == 'exp':
+        return n*p
+
+
+def getBinomialLogPmfs(n: int, p):
+    '''
+    Log probabilities of 0 to 'n' successes for each probability in 'p'
+    (1 row per probability), computed with the pmf recurrence:
+
+        log Pr(X=i+1) = log Pr(X=i) + log(n-i) - log(i+1) + log(p/(1-p))
+        log Pr(X=0) = n * log(1-p)
+    '''
+    p = np.asarray(p, dtype=float).reshape(-1, 1)
+    i = np.arange(n+1)
+    # log of the binomial coefficients: cumulative sum of the recurrence
+    logComb = np.concatenate([[0.0], np.cumsum(np.log(n - i[:-1])
+                                               - np.log(i[1:]))])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logPmfs = logComb + n*np.log1p(-p) + i*(np.log(p) - np.log1p(-p))
+
+    # p = 0 or p = 1: all probability at 0 or 'n' successes
+    certain = np.where(i == 0, 0.0, -np.inf), np.where(i == n, 0.0, -np.inf)
+    logPmfs = np.where(p == 0, certain[0], logPmfs)
+    return np.where(p == 1, certain[1], logPmfs)
+
+
+def PoissonDistArray(u, lower_k, upper_k=None):
+    '''
+    Array version of 'PoissonDist'.
+
+    Parameters:
+    -----------
+    u - array of mean number of successes.
+    lower_k - array of number of successes.
+    upper_k - if passed, probabilities are added up to [upper_k] (inclusive).
+    '''
+    from scipy import stats
+
+    if upper_k is None:
+        return stats.poisson.pmf(lower_k, u)
+
+    # Pr(lower_k <= X <= upper_k), 0 when lower_k > upper_k
+    between = (stats.poisson.cdf(upper_k, u)
+               - stats.poisson.cdf(np.asarray(lower_k) - 1, u))
+    return np.maximum(between, 0)
+
+
+def GeometricDistArray(p, k, mode='pdf'):
+    '''
+    Array version of 'GeometricDist' (number of failures 'k' until the
+    first success).
+
+    Parameters:
+    -----------
+    p - array of success probabilities.
+    k - array of independent trials until first success.
+    mode - 'exp', 'var', 'cdf' or 'pdf' (by default).
+    '''
+    p, k = np.asarray(p, dtype=float), np.asarray(k)
+
+    if mode == 'pdf':
+        return np.where(k >= 0, ((1-p)**k)*p, 0.0)
+    if mode == 'var':
+        return (1-p)/(p**2)
+    if mode == 'exp':
+        return (1-p)/p
+
+    # else if mode == 'cdf'
+    with np.errstate(divide='ignore'):
+        cdf = -np.expm1((k+1)*np.log1p(-p))
+    return np.where(k >= 0, np.where(p < 1, cdf, 1.0), 0.0)
@@ -1,10 +1,13 @@
 import math
+import os
+import json
+import multiprocessing as mp
 
 import operator
 from functools import reduce
 import itertools as it
 
-from tabulate import tabulate
+import numpy as np
 from neoBayesian.helpers.helpers import *
 
 
@@ -20,22 +23,113 @@ def splitDF(rows, target):
     return x_train, x_test, targets
 
 
-def getProbaTuples(x_train, x_test, target, target_col):
+def getCountTables(x_train, target_col):
+    '''
+    Aggregates the weighted counts ('n' column) of the training set once
+    so that conditional probabilities can be served by dictionary lookups.
+
+    Returns:
+    --------
+    dictionary with:
+        total: total number of observations.
+        targets: {target: number of observations}.
+        conditionals: {(column, value, target): number of observations}.
+        categories: {column: set of values} (cardinality for smoothing).
+    '''
+    tables = {'total': 0, 'targets': {}, 'conditionals': {}, 'categories': {}}
+    targets, conditionals = tables['targets'], tables['conditionals']
+    categories = tables['categories']
+
+    for dc in x_train:
+        n, target = int(dc['n']), dc[target_col]
+        tables['total'] += n
+        targets[target] = targets.get(target, 0) + n
+        # key-value pair for each predictor variable (last 2 columns excluded)
+        for col, value in list(dc.items())[:-2]:
+            key = (col, value, target)
+            conditionals[key] = conditionals.get(key, 0) + n
+            categories.setdefault(col, set()).add(value)
+
+    return tables
+
+
+def mergeCountTables(acc, tables):
+    '''
+    Adds count tables from 'getCountTables' into the accumulated tables
+    'acc' (updated in place).
+    '''
+    acc['total'] += tables['total']
+    for key in ('targets', 'conditionals'):
+        accDc = acc[key]
+        for k, n in tables[key].items():
+            accDc[k] = accDc.get(k, 0) + n
+    for col, values in tables['categories'].items():
+        acc['categories'].setdefault(col, set()).update(values)
+
+    return acc
+
+
+def countCsv(csv_path, target_col, chunksize=100000):
+    '''
+    Builds the count tables reading the CSV file in chunks, so memory is
+    bounded by the number of categories and not by the number of rows.
+    Requirements are the same as 'pyNaiveBayes': last 2 columns must be
+    the 'target' & count 'n', rows with an empty target are test rows.
+
+    Returns:
+    --------
+    Tuple: (count tables (see 'getCountTables'),
+            x_test: list of key-value pairs for each test row).
+    '''
+    tables = getCountTables([], target_col)
+    x_tests = []
+
+    for rows in csvChunks(csv_path, chunksize):
+        x_train = [dc for dc in rows if dc[target_col]]
+        x_tests += [list(dc.items())[:-2] for dc in rows if not dc[target_col]]
+        mergeCountTables(tables, getCountTables(x_train, target_col))
+
+    return tables, x_tests
+
+
+def getConditional(tables, col, value, target, alpha=0):
+    '''Pr(col=value|target) from the count tables (see 'getProbaTuples').'''
+    # total number of observations from target category
+    tbase = tables['targets'][target]
+    # number of observations in target group where column equals value
+    count = tables['conditionals'].get((col, value, target), 0)
+    if not alpha:
+        return count/tbase
+    cardinality = len(tables['categories'].get(col, ()))
+    return (count + alpha)/(tbase + alpha*cardinality)
+
+
+def getProbaTuples(tables, x_test, target, target_col, alpha=0):
     '''
     Computes the conditional probability for each set of observations
     given the target. Assumes conditional independence.
+
+    With additive (Laplace) smoothing 'alpha', categories never seen
+    with the target don't get probability 0. Formula:
+
+        Pr(x-i|Target) =   count(x-i, Target) + alpha
+                         ----------------------------------
+                         count(Target) + alpha * categories
+
+    Parameters:
+    -----------
+    tables: count tables from 'getCountTables'.
+    x_test: list of key-value pairs (column name-value) of 1 observation.
+    target: target category.
+    target_col: column name with 'target'.
+    alpha: smoothing parameter (0 by default: no smoothing).
     '''
     # total number of observations from target category
-    tbase = sum([int(dc['n']) for dc in x_train if dc[target_col]==target])
+    tbase = tables['targets'][target]
     # total number of observations
-    total = sum([int(dc['n']) for dc in x_train])
+    total = tables['total']
 
-    # get dictionary in target group if column equals value (dc[tp[0]]==tp[1])
-    filterDc = lambda dc, tp: dc[tp[0]]==tp[1] and dc[target_col]==target
-    def getProba(tp):
-        # filter observations by each group passed and get numbers
-        countGroup = [int(dc['n']) for dc in x_train if filterDc(dc, tp)]
-        return sum(countGroup)/tbase
+    getProba = lambda tp: getConditional(tables, tp[0], tp[1], target, alpha)
 
     # v_tuple: key-value pair for each predictor variable (column name-value)
     packTuple = lambda v_tuple: (v_tuple[0], v_tuple[1], getProba(v_tuple))
@@ -49,24 +143,64 @@ def getProbaTuples(x_train, x_test, target, target_col):
     return conditionals + [infoDC]
 
 
-def display(ls):
-    '''Display conditional and Intersection probabilities per target.'''
+def getPosteriors(tables, x_test, targets, alpha=0):
+    '''
+    Computes final probabilities for 1 observation without keeping the
+    conditional probabilities. Same output as 'getFinalProbas'.
+    '''
+    total = tables['total']
+
+    def getIntersection(target):
+        tProba = tables['targets'][target]/total
+        getProba = lambda tp: getConditional(tables, tp[0], tp[1], target,
+                                             alpha)
+        return multiply(list(map(getProba, x_test))) * tProba
+
+    intersections = list(map(getIntersection, targets))
+    marginal = sum(intersections)
+    return [(t, round(inter/marginal, 4))
+            for t, inter in zip(targets, intersections)]
+
+
+def explainObservation(tables, x_test, targets, target_col, alpha=0):
+    '''
+    Conditional probabilities per target for 1 observation, computed on
+    request only (pass the result to 'display').
+    '''
+    perTarget = lambda t: getProbaTuples(tables, x_test, t, target_col, alpha)
+    return list(map(perTarget, targets))
+
+
+def renderExplanation(ls):
+    '''Conditional and Intersection probabilities per target (string).'''
+    from tabulate import tabulate
+
     def iterOverTarget(l):
         dc = l[-1]
         tProba = round(dc['tgProba'], 8)
         intersection = round(dc['intersec'], 8)
         head = ('Var', 'Category', 'Probability')
 
-        print(f"\nPr(Target => {dc['tgCol']}:{dc['tgName']}):", tProba)
-        print('Support:', dc['support'])
-        print(f"\nPr(Observations | {dc['tgName']}):")
-        print(tabulate(l[:-2], headers=head))
-        print(f"\nIntersection = {intersection}")
+        return [
+            f"\nPr(Target => {dc['tgCol']}:{dc['tgName']}): {tProba}",
+            f"Support: {dc['support']}",
+            f"\nPr(Observations | {dc['tgName']}):",
+            tabulate(l[:-2], headers=head),
+            f"\nIntersection = {intersection}"
+        ]
 
-    [iterOverTarget(l) for l in ls]
     head = ('Target', 'Proba')
-    print('\n RESULTS:')
-    print(tabulate(getFinalProbas(ls), tablefmt="fancy_grid", headers=head))
+    return '\n'.join(
+        [line for l in ls for line in iterOverTarget(l)] + [
+        '\n RESULTS:',
+        tabulate(getFinalProbas(ls), tablefmt="fancy_grid", headers=head)
+    ])
+
+
+def display(ls):
+    '''Display conditional and Intersection probabilities per target.'''
+    if not isQuiet():
+        print(renderExplanation(ls))
 
 
 def getIntersections(ls):
@@ -98,7 +232,47 @@ def getFinalProbas(ls):
             for l in ls]
 
 
-def pyNaiveBayes(csv_path, target_col, verbose=False, display_n=5):
+# count tables shared with the worker processes of 'scoreInParallel'
+_shared = {}
+
+
+def _shareTables(tables, targets, alpha):
+    '''Pool initializer: keeps the count tables in the worker process.'''
+    _shared.update(tables=tables, targets=targets, alpha=alpha)
+
+
+def _scoreShard(x_tests):
+    '''Final probabilities for a shard of observations (worker process).'''
+    tables, targets, alpha = (_shared[k] for k in ('tables', 'targets',
+                                                   'alpha'))
+    return [getPosteriors(tables, x_test, targets, alpha)
+            for x_test in x_tests]
+
+
+def scoreInParallel(tables, x_tests, targets, processes, alpha=0):
+    '''
+    Computes final probabilities (see 'getPosteriors') for each observation
+    sharding the observations across a pool of worker processes. Results
+    are returned in input order.
+
+    The count tables are handed to each worker once when the pool starts
+    (inherited without copying where processes are forked), only the
+    shards of observations are sent per task.
+    '''
+    methods = mp.get_all_start_methods()
+    ctx = mp.get_context('fork' if 'fork' in methods else None)
+
+    # a few shards per process to balance the load
+    size = max(1, math.ceil(len(x_tests)/(processes*4)))
+    shards = [x_tests[i:i+size] for i in range(0, len(x_tests), size)]
+
+    with ctx.Pool(processes, _shareTables,
+                  (tables, targets, alpha)) as pool:
+        return list(it.chain.from_iterable(pool.map(_scoreShard, shards)))
+
+
+def pyNaiveBayes(csv_path, target_col, verbose=False, display_n=5,
+                 chunksize=100000, processes=1, alpha=0):
     '''
     Calculates Probability of conditional event for each target
     (--> Pr(Target Category|x-1 AND x-2 AND ...x-n )) for a single
@@ -117,24 +291,355 @@ def pyNaiveBayes(csv_path, target_col, verbose=False, display_n=5):
     csv_path: path of csv file. Requirements:
               - Last 2 columns must be the 'target' & count 'n'
     target_col: column name with 'target' (y_train).
-    '''
-    # split the CSV file =>
-    # x_train: list of dictionaries. Each dc represents 1 observation where
-    #          'key' if the column name and 'value' the value in that row.
-    # x_test: list of observations where target column is null.
-    # targets: a set of each target/category in the target column.
-    x_train, x_tests, targets = splitDF(csvAsDicts(csv_path), target_col)
+    verbose: display conditional probabilities of some observations
+             (unless quiet mode is on).
+    display_n: number of observations displayed (the first 'display_n') or
+               list of the observation indexes to display.
+    chunksize: number of rows read from the CSV file at once.
+    processes: number of worker processes used to score the observations.
+    alpha: additive smoothing (see 'getProbaTuples'). With 0 (default),
+           categories never seen with a target give probability 0.
 
-    def getProbabilities(x_test):
-        # get probability for each independent conditional event in x_test
-        perTarget = lambda t: getProbaTuples(x_train, x_test, t, target_col)
-        return list(map(perTarget, targets))
+    Returns:
+    --------
+    1 list of (target, probability) tuples per observation. Conditional
+    probabilities are only computed for the displayed observations (see
+    'explainObservation' to inspect others).
+    '''
+    # read the CSV file in chunks =>
+    # tables: weighted counts per target and per (column, value, target).
+    # x_tests: list of observations where target column is null.
+    tables, x_tests = countCsv(csv_path, target_col, chunksize)
+    targets = list(tables['targets'])
 
-    allProbabilities = list(map(getProbabilities, x_tests))
+    if processes > 1:
+        finalProbas = scoreInParallel(tables, x_tests, targets, processes,
+                                      alpha)
+    else:
+        finalProbas = [getPosteriors(tables, x_test, targets, alpha)
+                       for x_test in x_tests]
 
-    if verbose:
+    if verbose and not isQuiet():
+        # conditional probabilities only for the observations displayed
+        explain = lambda n: explainObservation(tables, x_tests[n], targets,
+                                               target_col, alpha)
         title = '\n-----> OBSERVATION:'
-        itDisplay = lambda n: print(title, n) or display(allProbabilities[n])
-        [itDisplay(n) for n in range(display_n)]
+        itDisplay = lambda n: print(title, n) or display(explain(n))
+        indexes = (range(display_n) if isinstance(display_n, int)
+                   else display_n)
+        [itDisplay(n) for n in indexes]
+
+    return finalProbas
+
+
+class NaiveBayes:
+    '''
+    Naive Bayes model that keeps the weighted count tables as arrays so it
+    can be fitted once, saved to disk and reloaded without parsing the CSV
+    file again.
+
+    Storage:
+    --------
+    targets: list of target categories.
+    columns: list of predictor columns.
+    categories: 1 dictionary per column {value: row index in counts}.
+    targetCounts: array with number of observations per target.
+    counts: 1 array per column (categories x targets) with the number of
+            observations per (value, target).
+
+    Parameters:
+    -----------
+    target_col: column name with 'target' (y_train).
+    alpha: additive smoothing (see 'getProbaTuples'), 0 by default.
+    '''
+    def __init__(self, target_col, alpha=0):
+        self.target_col = target_col
+        self.alpha = alpha
+        self._reset()
+
+    def _reset(self):
+        '''Empty count tables.'''
+        self.targets = []
+        self.columns = []
+        self.categories = []
+        self.targetCounts = np.zeros(0, dtype=np.int64)
+        self.counts = []
+        self._logCache = None
+
+    def fit(self, rows):
+        '''
+        Fits the model from a list of dictionaries (see 'csvAsDicts').
+        Rows with an empty target are ignored.
+        '''
+        self._reset()
+        return self.partialFit(rows)
+
+    def fitCsv(self, csv_path, chunksize=100000):
+        '''
+        Fits the model reading the CSV file in chunks (see 'countCsv').
+        Memory is bounded by the number of categories, test rows are
+        ignored.
+        '''
+        self._reset()
+        for rows in csvChunks(csv_path, chunksize):
+            self.partialFit(rows)
+        return self
+
+    def partialFit(self, rows, sign=1):
+        '''
+        Updates the fitted model with new rows (list of dictionaries) in
+        time proportional to the number of rows. Probabilities are the same
+        as fitting the model again with all the rows.
+
+        Parameters:
+        -----------
+        rows: list of dictionaries. Rows with an empty target are ignored.
+        sign: 1 to add the rows, -1 to retract rows added before.
+        '''
+        x_train = [dc for dc in rows if dc[self.target_col]]
+        self._addTables(getCountTables(x_train, self.target_col), sign)
+        return self
+
+    def _addTables(self, tables, sign=1):
+        '''Fold count tables from 'getCountTables' into the count arrays.'''
+        self._logCache = None
+        # memory-mapped arrays from 'load' are read-only
+        if not self.targetCounts.flags.writeable:
+            self.targetCounts = np.array(self.targetCounts)
+            self.counts = [np.array(counts) for counts in self.counts]
+
+        targetIds = {t: i for i, t in enumerate(self.targets)}
+        columnIds = {c: j for j, c in enumerate(self.columns)}
+
+        # register new targets, columns and categories
+        for target in tables['targets']:
+            if target not in targetIds:
+                targetIds[target] = len(self.targets)
+                self.targets.append(target)
+        for col, value, _ in tables['conditionals']:
+            if col not in columnIds:
+                columnIds[col] = len(self.columns)
+                self.columns.append(col)
+                self.categories.append({})
+                self.counts.append(np.zeros((0, 0), dtype=np.int64))
+            catIds = self.categories[columnIds[col]]
+            if value not in catIds:
+                catIds[value] = len(catIds)
+
+        self._resize()
+
+        for target, n in tables['targets'].items():
+            self.targetCounts[targetIds[target]] += sign*n
+        for (col, value, target), n in tables['conditionals'].items():
+            j = columnIds[col]
+            i = self.categories[j][value]
+            self.counts[j][i, targetIds[target]] += sign*n
+
+    def _resize(self):
+        '''Pad count arrays with zeros for newly registered categories.'''
+        nTargets = len(self.targets)
+        pad = lambda arr, shape: np.pad(
+            arr, [(0, new - old) for new, old in zip(shape, arr.shape)]
+        )
+        if self.targetCounts.shape != (nTargets,):
+            self.targetCounts = pad(self.targetCounts, (nTargets,))
+        for j, catIds in enumerate(self.categories):
+            shape = (len(catIds), nTargets)
+            if self.counts[j].shape != shape:
+                self.counts[j] = pad(self.counts[j], shape)
+
+    def encode(self, x_tests):
+        '''
+        Integer-encodes observations into an array with 1 row per
+        observation and 1 column per model column. Codes are the category
+        indexes plus:
+            -1: category never seen in training (probability 0).
+            -2: column not present in the observations (ignored).
+
+        Parameters:
+        -----------
+        x_tests: list of observations. Each observation is a list of
+                 key-value pairs (column name-value) or a dictionary.
+                 All observations must have the columns of the first one.
+                 Other keys (target column, 'n', columns unknown to the
+                 model) are skipped, so rows in the format of 'fit' can
+                 be passed directly.
+        '''
+        codes = np.full((len(x_tests), len(self.columns)), -2, dtype=np.int64)
+        if not len(x_tests):
+            return codes
+
+        first = x_tests[0]
+        if isinstance(first, dict):
+            names = list(first)
+            getValues = lambda pos, col: [dc[col] for dc in x_tests]
+        else:
+            names = [tp[0] for tp in first]
+            getValues = lambda pos, col: [x[pos][1] for x in x_tests]
+
+        columnIds = {c: j for j, c in enumerate(self.columns)}
+        for pos, col in enumerate(names):
+            j = columnIds.get(col)
+            if j is None:
+                continue
+            getCode = self.categories[j].get
+            codes[:, j] = [getCode(v, -1) for v in getValues(pos, col)]
+
+        return codes
+
+    def _cardinality(self, j):
+        '''Number of categories of column 'j' with observations.'''
+        return int((self.counts[j].sum(axis=1) > 0).sum())
+
+    def _logTables(self):
+        '''
+        Log priors and 1 array of log conditionals per column, cached until
+        the counts change. 2 rows are appended to each array for codes
+        -2 (log 1) and -1 (categories never seen in training).
+        '''
+        if self._logCache is not None:
+            return self._logCache
+
+        alpha = self.alpha
+        nTargets = len(self.targets)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logPrior = (np.log(self.targetCounts)
+                        - np.log(self.targetCounts.sum()))
+            logConds = []
+            for j, counts in enumerate(self.counts):
+                # smoothed denominator uses the column cardinality
+                logBase = np.log(self.targetCounts
+                                 + alpha*self._cardinality(j))
+                unseen = np.log(np.full(nTargets, float(alpha))) - logBase
+                logConds.append(np.vstack([np.log(counts + alpha) - logBase,
+                                           np.zeros(nTargets), unseen]))
+
+        # targets without observations (log 0 - log 0) can't be predicted
+        logConds = [np.where(np.isnan(lc), -np.inf, lc) for lc in logConds]
+        self._logCache = (logPrior, logConds)
+
+        return self._logCache
+
+    def predictProba(self, x_tests):
+        '''
+        Computes final probabilities for all observations at once in
+        log space (no underflow with many predictors). Formula:
+
+            log Pr(Target, x) = log Pr(Target) + sum(log Pr(x-i|Target))
+
+            Pr(Target|x) = exp(log Pr(Target, x)
+                               - logsumexp(log Pr(Targets, x)))
+
+        Returns:
+        --------
+        array (observations x targets) with probabilities (targets in the
+        order of 'self.targets'). Rows are NaN when all targets have
+        probability 0.
+
+        Parameters:
+        -----------
+        x_tests: list of observations (see 'encode') or encoded array.
+        '''
+        codes = (x_tests if isinstance(x_tests, np.ndarray)
+                 else self.encode(x_tests))
+        logPrior, logConds = self._logTables()
+
+        logJoint = np.repeat(logPrior[None, :], len(codes), 0)
+        for j, logCond in enumerate(logConds):
+            logJoint += logCond[codes[:, j]]
+
+        # log-sum-exp normalisation
+        with np.errstate(invalid='ignore'):
+            probas = np.exp(logJoint - logJoint.max(axis=1, keepdims=True))
+            return probas/probas.sum(axis=1, keepdims=True)
+
+    def predict(self, x_tests):
+        '''
+        Computes final probabilities for each observation. Returns the same
+        output as 'getFinalProbas': 1 list of (target, probability) tuples
+        per observation.
+
+        Parameters:
+        -----------
+        x_tests: list of observations (see 'encode') or encoded array.
+        '''
+        return [[(t, round(float(p), 4)) for t, p in zip(self.targets, row)]
+                for row in self.predictProba(x_tests)]
+
+    def explain(self, x_test):
+        '''
+        Conditional probabilities per target for 1 observation (list of
+        key-value pairs or dictionary) in the format of 'getProbaTuples'.
+        Pass the result to 'display' to print the tables. Keys that are not
+        model columns are skipped (see 'encode').
+        '''
+        pairs = list(x_test.items()) if isinstance(x_test, dict) else x_test
+        columnIds = {c: j for j, c in enumerate(self.columns)}
+        pairs = [(col, value) for col, value in pairs if col in columnIds]
+        total = int(self.targetCounts.sum())
+
+        def getProba(col, value, t):
+            j = columnIds[col]
+            i = self.categories[j].get(value)
+            count = 0 if i is None else int(self.counts[j][i, t])
+            tbase = int(self.targetCounts[t])
+            return ((count + self.alpha) /
+                    (tbase + self.alpha*self._cardinality(j)))
+
+        def perTarget(t):
+            tbase = int(self.targetCounts[t])
+            conditionals = [(col, value, getProba(col, value, t))
+                            for col, value in pairs]
+            inter = multiply([tp[-1] for tp in conditionals]) * (tbase/total)
+            infoDC = {'tgCol':self.target_col, 'tgName':self.targets[t],
+                      'tgProba':tbase/total, 'support':tbase, 'intersec':inter}
+            return conditionals + [infoDC]
+
+        return [perTarget(t) for t in range(len(self.targets))]
+
+    def save(self, path):
+        '''
+        Saves the model into directory 'path':
+            counts.npy: count arrays of all columns stacked by rows.
+            targets.npy: number of observations per target.
+            model.json: target column, targets, columns and categories.
+        '''
+        os.makedirs(path, exist_ok=True)
+        stacked = (np.vstack(self.counts) if self.counts else
+                   np.zeros((0, len(self.targets)), dtype=np.int64))
+        np.save(os.path.join(path, 'counts.npy'), stacked)
+        np.save(os.path.join(path, 'targets.npy'), self.targetCounts)
+
+        meta = {'target_col': self.target_col, 'alpha': self.alpha,
+                'targets': self.targets,
+                'columns': self.columns,
+                'categories': [list(catIds) for catIds in self.categories]}
+        with open(os.path.join(path, 'model.json'), 'w',
+                  encoding='utf-8') as ofile:
+            json.dump(meta, ofile)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        '''
+        Loads a model saved with 'save'. With 'mmap' the count arrays are
+        memory-mapped (read-only) instead of read into memory.
+        '''
+        with open(os.path.join(path, 'model.json'), 'r',
+                  encoding='utf-8') as ofile:
+            meta = json.load(ofile)
+
+        mode = 'r' if mmap else None
+        stacked = np.load(os.path.join(path, 'counts.npy'), mmap_mode=mode)
+
+        model = cls(meta['target_col'], meta.get('alpha', 0))
+        model.targets = meta['targets']
+        model.columns = meta['columns']
+        model.categories = [{v: i for i, v in enumerate(values)}
+                            for values in meta['categories']]
+        model.targetCounts = np.load(os.path.join(path, 'targets.npy'),
+                                     mmap_mode=mode)
+        # views over the stacked array, 1 per column
+        offsets = np.cumsum([len(v) for v in meta['categories']])[:-1]
+        model.counts = np.split(stacked, offsets)
 
-    return [getFinalProbas(ls) for ls in allProbabilities]
+        return model
@@ -1,9 +1,116 @@
-import itertools as it
+import math
+from fractions import Fraction
+
+import numpy as np
 from neoBayesian.helpers.helpers import *
-from tabulate import tabulate
 
 
-def probaByBruteForce(probability_map, cutoff, iterations):
+def getSumDistribution(probability_map, iterations):
+    '''
+    Distribution of the sum of 'iterations' independent outcomes drawn from
+    'probability_map'. Outcomes are placed on a grid starting at the
+    smallest key with a rational step (gcd of the gaps between keys, so
+    keys like 0.5 are supported). The probability array of 1 outcome is
+    convolved with itself by repeated squaring, so the cost is polynomial
+    in the size of the support instead of |outcomes|^iterations.
+    Convolutions are direct (exact up to float rounding of each term), so
+    tiny tail probabilities stay reliable.
+
+    Returns:
+    --------
+    Tuple of arrays: (possible sums, probabilities).
+    '''
+    keys = sorted(probability_map)
+    fractions = [Fraction(k).limit_denominator() for k in keys]
+    low = fractions[0]
+    gaps = [f - low for f in fractions[1:]]
+    # step = gcd(numerators)/lcm(denominators) of the gaps
+    step = (Fraction(math.gcd(*[g.numerator for g in gaps]),
+                     math.lcm(*[g.denominator for g in gaps]))
+            if gaps else Fraction(1))
+
+    single = np.zeros(int((fractions[-1] - low)/step) + 1)
+    for k, f in zip(keys, fractions):
+        single[int((f - low)/step)] += probability_map[k]
+
+    distribution, power, n = np.ones(1), single, iterations
+    while n:
+        if n & 1:
+            distribution = np.convolve(distribution, power)
+        n >>= 1
+        if n:
+            power = np.convolve(power, power)
+
+    # sums computed on a common denominator, then divided once
+    denominator = math.lcm(low.denominator, step.denominator)
+    start = int(iterations*low*denominator)
+    values = (start + int(step*denominator)*np.arange(len(distribution))
+              )/denominator
+    return values, distribution
+
+
+def estimateBySampling(probability_map, cutoff, iterations, seed=None,
+                       precision=1e-3, batch=10000, max_samples=10**6):
+    '''
+    Monte Carlo estimate of Pr(X >= cutoff) and EXP(X|X >= cutoff), where X
+    is the sum of 'iterations' outcomes drawn from 'probability_map' (keys
+    can be any number). Sequences are drawn in vectorized batches until
+    the standard errors reach 'precision' or 'max_samples' are drawn.
+    Standard errors:
+        SE(Pr) = sqrt(Pr * (1 - Pr) / samples)
+        SE(EXP) = sqrt(Var(X|event) / samples in event)
+
+    Parameters:
+    -----------
+    seed: seed of the random generator (reproducible results).
+    precision: stop when SE(Pr) <= precision and
+               SE(EXP) <= precision * |EXP|.
+    batch: number of sequences drawn at once.
+    max_samples: maximum number of sequences drawn.
+
+    Returns:
+    --------
+    Tuple: (Probability, conditional EXP value, SE(Probability),
+            SE(conditional EXP), number of sequences drawn).
+    '''
+    rng = np.random.default_rng(seed)
+    outcomes = np.array(list(probability_map), dtype=float)
+    weights = np.array(list(probability_map.values()), dtype=float)
+    weights /= weights.sum()
+    # draws per call bounded to ~1M values
+    columns = max(1, min(iterations, 10**6//batch))
+
+    samples, hits, total, squares = 0, 0, 0.0, 0.0
+    while samples < max_samples:
+        size = min(batch, max_samples - samples)
+        sums = np.zeros(size)
+        for done in range(0, iterations, columns):
+            shape = (size, min(columns, iterations - done))
+            sums += rng.choice(outcomes, size=shape, p=weights).sum(axis=1)
+
+        inEvent = sums[sums >= cutoff]
+        samples += size
+        hits += len(inEvent)
+        total += float(inEvent.sum())
+        squares += float((inEvent**2).sum())
+
+        proba = hits/samples
+        seProba = math.sqrt(proba*(1 - proba)/samples)
+        if hits < 2:
+            continue
+        exp = total/hits
+        seExp = math.sqrt(max(squares/hits - exp**2, 0)/hits)
+        if seProba <= precision and seExp <= precision*abs(exp):
+            break
+
+    exp = total/hits if hits else math.nan
+    seExp = (math.sqrt(max(squares/hits - exp**2, 0)/hits)
+             if hits > 1 else math.nan)
+    return (proba, exp, seProba, seExp, samples)
+
+
+def probaByBruteForce(probability_map, cutoff, iterations, mode='exact',
+                      seed=None, precision=1e-3, max_samples=10**6):
     '''
     1 - Calculates the probability of a random variable 'X'
         by computing all possible associated probabilities.
@@ -12,51 +119,69 @@ def probaByBruteForce(probability_map, cutoff, iterations):
         Formula:
             EXP(X|event) = EXP(X and event)/Pr(event)
 
+    The distribution of the sum of outcomes is computed by convolution
+    (see 'getSumDistribution') instead of listing every sequence. The
+    table shows the probability of each event value (sum).
+
+    With mode='sample' results are estimated by Monte Carlo instead (see
+    'estimateBySampling'), for outcome maps too large for the exact
+    computation (e.g. keys whose gaps need a very fine grid).
+
     Parameters:
     -----------
     probability_map: dictionary with probabilities for each outcome.
-                     keys must be the actual values (integer) for each outcome.
+                     keys must be the actual values for each outcome.
     cutoff: filter set of outcomes >= cutoff value.
     iterations: number of repetitions for each set of outcomes.
+    mode: 'exact' (default) or 'sample'.
+    seed, precision, max_samples: sampling options (mode='sample').
 
     Returns:
     --------
-    Tuple: (Probability of the event -> Pr(X=[...]),
-            EXP value conditional on the event -> EXP(X|X=[...])).
+    Result: (Probability of the event -> Pr(X=[...]),
+             EXP value conditional on the event -> EXP(X|X=[...])).
+    With mode='sample' the standard errors of both are added to the tuple.
+    Results are printed unless quiet mode is on.
     '''
-    # multiply 1 sequence of events by the number of iterations
-    all_outcomes = [sorted(probability_map.keys())]*iterations
+    if mode == 'sample':
+        PROBABILITY, EXPECTATION, seProba, seExp, samples = estimateBySampling(
+            probability_map, cutoff, iterations, seed, precision,
+            max_samples=max_samples)
+
+        render = lambda: '\n'.join([
+            f'Sequences drawn: {samples}',
+            f'\nEVENT PROBABILITY: {round(PROBABILITY, 6)} '
+            f'(SE {round(seProba, 6)}) <---',
+            f'Conditional EXP: {round(EXPECTATION, 6)} '
+            f'(SE {round(seExp, 6)}) <---'
+        ])
 
-    # get tuples with all possible sequences, the sum of points, and its
-    # probability of occurrence
-    mapAndMultiply = lambda tp: multiply((probability_map[v] for v in tp))
-    complete_tuples = map(lambda tp: tuple((tp, sum(tp), mapAndMultiply(tp))),
-                          # cartisian products: all possible sequences
-                          it.product(*all_outcomes))
+        return report(Result((PROBABILITY, EXPECTATION, seProba, seExp),
+                             render))
 
-    # filter sequence of events above cutoff
-    filtered_tuples = filter(lambda tp: tp[1] >= cutoff, complete_tuples)
-    results = sorted(filtered_tuples, key=lambda tp: tp[1], reverse=True)
+    values, probabilities = getSumDistribution(probability_map, iterations)
+    inEvent = values >= cutoff
 
     # final results
-    PROBABILITY = sum([tp[-1] for tp in results])
-    EXPECTATION = sum([tp[1]*tp[-1] for tp in results])/PROBABILITY
+    PROBABILITY = float(probabilities[inEvent].sum())
+    EXPECTATION = float((values*probabilities)[inEvent].sum())/PROBABILITY
+
+    def render():
+        from tabulate import tabulate
 
-    # rounding and grouping for displaying purposes only --------------
-    # round probabilities, sort and group
-    roundLast = lambda tp: tp[1:-1] + (round(tp[-1], 8),)
-    results_p = sorted([roundLast(tp) for tp in results],
-                   key=lambda tp: (tp[0], tp[1]),
-                   reverse=True)
-    grouped = [(key[0], key[1], len(list(group)))
-                for key, group in
-                it.groupby(results_p)]
+        # per event value, highest first
+        grouped = [(int(v) if v == int(v) else float(v), round(float(p), 8))
+                   for v, p in zip(values[inEvent][::-1],
+                                   probabilities[inEvent][::-1])
+                   if p > 0]
 
-    print(tabulate(grouped, headers=('Event Value', 'Probability', 'Count')))
-    print(f'\nEVENT PROBABILITY: {round(PROBABILITY, 6)} <---')
-    print(f'Conditional EXP: {round(EXPECTATION, 6)} <---')
+        return '\n'.join([
+            tabulate(grouped, headers=('Event Value', 'Probability')),
+            f'\nEVENT PROBABILITY: {round(PROBABILITY, 6)} <---',
+            f'Conditional EXP: {round(EXPECTATION, 6)} <---'
+        ])
 
-    return (PROBABILITY, EXPECTATION)
+    return report(Result((PROBABILITY, EXPECTATION), render))
 
 
 def getTestStats(sensitivity, specificity, prevalence):
@@ -80,6 +205,10 @@ def getTestStats(sensitivity, specificity, prevalence):
     Sensitivity: Pr(T+|D+)
     Specificity: Pr(T-|D-)
     Prevalence: Pr(D+)
+
+    Returns:
+    --------
+    Result: (PPV, NPV), printed unless quiet mode is on.
     '''
     PPV = ((sensitivity*prevalence)/
           ((sensitivity*prevalence) + (1-specificity)*(1-prevalence))
@@ -88,7 +217,43 @@ def getTestStats(sensitivity, specificity, prevalence):
           ((specificity*(1-prevalence)) + (1-sensitivity)*prevalence)
           )
 
-    print(f'PPV={round(PPV, 5)}')
-    print(f'NPV={round(NPV, 5)}')
+    render = lambda: f'PPV={round(PPV, 5)}\nNPV={round(NPV, 5)}'
+
+    return report(Result((PPV, NPV), render))
+
+
+def getTestStatsArray(sensitivity, specificity, prevalence):
+    '''
+    Array version of 'getTestStats' (nothing is printed). Arguments are
+    broadcast against each other, so e.g. a column of operating points
+    (sensitivity, specificity) and a row of prevalences give PPV and NPV
+    matrices for the whole grid.
+
+    Prevalence 0 gives PPV = 0 and NPV = 1; prevalence 1 gives PPV = 1 and
+    NPV = 0. Any other 0/0 (e.g. no positive tests at all) gives nan.
+
+    Parameters:
+    -----------
+    Sensitivity: Pr(T+|D+) (array)
+    Specificity: Pr(T-|D-) (array)
+    Prevalence: Pr(D+) (array)
+
+    Returns:
+    --------
+    (PPV, NPV) arrays.
+    '''
+    sensitivity, specificity, prevalence = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float)
+          for a in (sensitivity, specificity, prevalence))
+    )
+    truePositives = sensitivity*prevalence
+    trueNegatives = specificity*(1-prevalence)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        PPV = truePositives/(truePositives + (1-specificity)*(1-prevalence))
+        NPV = trueNegatives/(trueNegatives + (1-sensitivity)*prevalence)
+
+    PPV = np.where(prevalence == 0, 0.0, np.where(prevalence == 1, 1.0, PPV))
+    NPV = np.where(prevalence == 0, 1.0, np.where(prevalence == 1, 0.0, NPV))
 
-    return (PPV, NPV)
+    return PPV, NPV
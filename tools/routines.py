@@ -6,7 +6,7 @@ import operator
 from functools import reduce
 import itertools as it
 
-from tabulate import tabulate
+import numpy as np
 from neoBayesian.helpers.helpers import *
 
 
@@ -29,19 +29,22 @@ def calculatePosteriorProba(numerator: tuple, denominator: list):
 
     Returns:
     --------
-    posterior probability.
+    posterior probability (ScalarResult: printed unless quiet mode is on).
     '''
     result = multiply(numerator)/doubleReduction(denominator+[numerator])
 
-    nString = prepareValues(numerator, bSign='*')
-    dString = prepareValues(denominator + [numerator])
+    def render():
+        nString = prepareValues(numerator, bSign='*')
+        dString = prepareValues(denominator + [numerator])
 
-    print(' '*int(len(dString)/2 - len(nString)/2), nString)
-    print('-'*len(dString))
-    print(dString)
-    print('\n=', round(result, 6))
+        return '\n'.join([
+            ' '*int(len(dString)/2 - len(nString)/2) + ' ' + nString,
+            '-'*len(dString),
+            dString,
+            f'\n= {round(result, 6)}'
+        ])
 
-    return result
+    return report(ScalarResult(result, render))
 
 
 def tabulateBayesianAlgorithm(*args):
@@ -53,6 +56,11 @@ def tabulateBayesianAlgorithm(*args):
     ('labeln', 'priorn', 'likelihoodn').
 
     Labels must be unique.
+
+    Returns:
+    --------
+    Result: (dictionary of posteriors per label, marginal probability).
+    The table is printed unless quiet mode is on.
     '''
     p_TYPE = ('Type', ('Prior', 'Likelihood', 'Joint', 'Posterior'))
 
@@ -66,10 +74,181 @@ def tabulateBayesianAlgorithm(*args):
     )
 
     dcToTabulate = dict([p_TYPE] + list(map(kvPairWithMarginal, ls_tabulate)))
+    posteriors = {k: v[-1] for k, v in dcToTabulate.items() if k != 'Type'}
+
+    def render():
+        from tabulate import tabulate
+
+        return '\n'.join([
+            tabulate(dcToTabulate, headers="keys"),
+            '\nMarginal Probability = sum([joint probabilities])',
+            f'= {round(marginal_proba, 4)}'
+        ])
+
+    return report(Result((posteriors, marginal_proba), render))
+
+
+def bayesRuleArray(priors, likelihoods, log=False):
+    '''
+    Batched version of 'tabulateBayesianAlgorithm' (nothing is printed).
+    1 case per row, 1 hypothesis per column:
+
+        joint = prior * likelihood
+        marginal = sum(joint) (per row)
+        posterior = joint / marginal
+
+    Parameters:
+    -----------
+    priors: 2-D array of prior probabilities (or 1 row shared by all cases).
+    likelihoods: 2-D array of likelihoods.
+    log: if True, 'priors' and 'likelihoods' are log probabilities. Joint
+         and marginal are then returned as log probabilities too (computed
+         with log-sum-exp, so tiny likelihoods don't underflow).
+
+    Returns:
+    --------
+    (joint, marginal, posterior) arrays. Rows with marginal 0 get nan
+    posteriors.
+    '''
+    priors = np.atleast_2d(np.asarray(priors, dtype=float))
+    likelihoods = np.atleast_2d(np.asarray(likelihoods, dtype=float))
+
+    if not log:
+        joint = priors * likelihoods
+        marginal = joint.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return joint, marginal, joint / marginal[:, None]
+
+    joint = priors + likelihoods
+    top = joint.max(axis=1, keepdims=True)
+    top = np.where(np.isfinite(top), top, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shifted = np.exp(joint - top)
+        total = shifted.sum(axis=1, keepdims=True)
+        marginal = (np.log(total) + top)[:, 0]
+        return joint, marginal, shifted / total
+
+
+def _logNormalize(logs):
+    '''Shifts rows of log probabilities so each row sums to 1.'''
+    top = logs.max(axis=1, keepdims=True)
+    top = np.where(np.isfinite(top), top, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = np.log(np.exp(logs - top).sum(axis=1, keepdims=True))
+        return logs - top - total
+
+
+class BayesianUpdater:
+    '''
+    Sequential Bayesian updating per entity: every posterior becomes the
+    prior of the next evidence event. Posteriors are stored as log
+    probabilities (1 row per entity in a growing array) and renormalized
+    after every update, so long chains of small likelihoods don't underflow.
+
+        log posterior = log prior + log likelihood - log marginal
+
+    Parameters:
+    -----------
+    priors: prior probabilities of the hypotheses (used for new entities).
+    hypotheses: labels of the hypotheses (optional).
+    capacity: initial number of rows (doubled when full).
+    '''
+    def __init__(self, priors, hypotheses=None, capacity=1024):
+        priors = np.asarray(priors, dtype=float)
+        with np.errstate(divide='ignore'):
+            self.logPriors = _logNormalize(np.log(priors)[None, :])[0]
+        self.hypotheses = (list(hypotheses) if hypotheses is not None
+                           else list(range(len(priors))))
+        self.index = {}
+        self.entities = []
+        self.logPosteriors = np.empty((max(capacity, 1), len(priors)))
+
+    def __len__(self):
+        return len(self.entities)
+
+    def _rows(self, entities):
+        '''Row of every entity (new entities start at the priors).'''
+        new = [e for e in dict.fromkeys(entities) if e not in self.index]
+        if new:
+            size = len(self.entities) + len(new)
+            capacity = len(self.logPosteriors)
+            while capacity < size:
+                capacity *= 2
+            if capacity > len(self.logPosteriors):
+                grown = np.empty((capacity, len(self.hypotheses)))
+                grown[:len(self.entities)] = self.logPosteriors[:len(self)]
+                self.logPosteriors = grown
+
+            self.logPosteriors[len(self.entities):size] = self.logPriors
+            self.index.update(zip(new, range(len(self.entities), size)))
+            self.entities += new
+
+        return np.array([self.index[e] for e in entities], dtype=np.intp)
+
+    def update(self, entity, likelihoods, log=False):
+        '''
+        Applies 1 evidence event to 'entity'.
+        Returns the new posterior probabilities.
+        '''
+        return self.updateMany([entity], [likelihoods], log)[0]
+
+    def updateMany(self, entities, likelihoods, log=False):
+        '''
+        Applies a batch of evidence events (1 likelihood row per entity;
+        entities can repeat and are then updated once per row).
+        Returns the new posterior probabilities of 'entities'.
+
+        Raises ValueError (and updates nothing) if the evidence of an
+        entity has probability 0 under every hypothesis still possible.
+        '''
+        entities = list(entities)
+        known = len(self.entities)
+        rows = self._rows(entities)
+        likelihoods = np.atleast_2d(np.asarray(likelihoods, dtype=float))
+        if not log:
+            with np.errstate(divide='ignore'):
+                likelihoods = np.log(likelihoods)
+
+        touched, positions = np.unique(rows, return_inverse=True)
+        updated = self.logPosteriors[touched]
+        np.add.at(updated, positions, likelihoods)
+
+        # marginal 0 (or NaN evidence): no posterior exists
+        impossible = ~np.isfinite(updated.max(axis=1))
+        if impossible.any():
+            names = [self.entities[r] for r in touched[impossible]]
+            # forget the entities added by this batch
+            for entity in self.entities[known:]:
+                del self.index[entity]
+            del self.entities[known:]
+            raise ValueError('Evidence with probability 0 under every '
+                             f'hypothesis for entities: {names}')
+
+        self.logPosteriors[touched] = _logNormalize(updated)
+        return np.exp(self.logPosteriors[rows])
+
+    def posterior(self, entity):
+        '''Current posterior probabilities of 'entity' (priors if unseen).'''
+        if entity not in self.index:
+            return np.exp(self.logPriors)
+        return np.exp(self.logPosteriors[self.index[entity]])
+
+    def snapshot(self, entities=None):
+        '''
+        Copy of the current posteriors.
 
-    print(tabulate(dcToTabulate, headers="keys"))
-    print('\nMarginal Probability = sum([joint probabilities])')
-    print(f'= {round(marginal_proba, 4)}')
+        Returns:
+        --------
+        (entities, posteriors array with 1 row per entity).
+        '''
+        if entities is None:
+            return list(self.entities), np.exp(self.logPosteriors[:len(self)])
+        entities = list(entities)
+        posteriors = np.tile(np.exp(self.logPriors), (len(entities), 1))
+        known = [i for i, e in enumerate(entities) if e in self.index]
+        rows = [self.index[entities[i]] for i in known]
+        posteriors[known] = np.exp(self.logPosteriors[rows])
+        return entities, posteriors
 
 
 def getTotalExpectationOrProbability(tuples_ls, *args):
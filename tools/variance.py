@@ -5,9 +5,9 @@ import operator
 from functools import reduce
 import itertools as it
 
-from tabulate import tabulate
+import numpy as np
 from neoBayesian.helpers.helpers import *
-from neoBayesian.models.discrete import BinomialDist
+from neoBayesian.models.discrete import getBinomialLogPmfs
 
 
 def varianceWithFormula(variances: list, exp_values: list, weights: list):
@@ -27,7 +27,8 @@ def varianceWithFormula(variances: list, exp_values: list, weights: list):
 
     Returns:
     --------
-    Ew[VARx[X|W]] + VARw[Ex[X|W]]
+    Ew[VARx[X|W]] + VARw[Ex[X|W]] (ScalarResult: printed unless quiet mode
+    is on).
     '''
     within_tuples = list(zip(variances, weights))
     between_tuples = list(zip(exp_values, weights))
@@ -43,58 +44,98 @@ def varianceWithFormula(variances: list, exp_values: list, weights: list):
     VARIANCE = within_variance + (mean_of_Xsquared - mean_squared)
 
     # Display results --------------------------------------------
-    print('Within variance values:')
-    print('-->', prepareValues(within_tuples))
-    print('--> Var[X=x|W_n] * W_n:', prepareValues(within_multiplied))
+    render = lambda: '\n'.join([
+        'Within variance values:',
+        f'--> {prepareValues(within_tuples)}',
+        f'--> Var[X=x|W_n] * W_n: {prepareValues(within_multiplied)}',
 
-    print('\nBetween expected values:')
-    print('-->', prepareValues(between_tuples))
-    print('--> E[X=x|W_n] * W_n:', prepareValues(between_multiplied))
+        '\nBetween expected values:',
+        f'--> {prepareValues(between_tuples)}',
+        f'--> E[X=x|W_n] * W_n: {prepareValues(between_multiplied)}',
 
-    print('\nE[X]: ', round(sum(between_multiplied), 3))
-    print('E[X]^2: ', round(mean_squared, 3))
-    print('E[X^2]: ', round(mean_of_Xsquared, 3))
-    print('---------------------------------------')
-    print(f'\nWithin-group variance: {round(within_variance, 5)}')
-    print(f'Between-group variance: {round(between_variance, 5)}')
-    print(f'VARIANCE: {round(VARIANCE, 5)}')
+        f'\nE[X]:  {round(sum(between_multiplied), 3)}',
+        f'E[X]^2:  {round(mean_squared, 3)}',
+        f'E[X^2]:  {round(mean_of_Xsquared, 3)}',
+        '---------------------------------------',
+        f'\nWithin-group variance: {round(within_variance, 5)}',
+        f'Between-group variance: {round(between_variance, 5)}',
+        f'VARIANCE: {round(VARIANCE, 5)}'
+    ])
 
-    return VARIANCE
+    return report(ScalarResult(VARIANCE, render))
 
 
-def varianceBruteForce(k: int, tuples_ls=[], dist='binomial'):
+def varianceWithFormulaArray(variances, exp_values, weights):
+    '''
+    Batched version of 'varianceWithFormula' (nothing is printed).
+    1 mixture per row, 1 group per column:
+
+    within: sum(W * VAR) -> Ew[VARx[X|W]]
+    between: sum(W * E^2) - sum(W * E)^2 -> VARw[Ex[X|W]]
+
+    Parameters:
+    -----------
+    (arrays of the same shape, or broadcastable to it.)
+    variances: 2-D array of variances.
+    exp_values: 2-D array of expected values.
+    weights: 2-D array of weights.
+
+    Returns:
+    --------
+    (within variances, between variances, total variances) arrays with
+    1 value per mixture.
+    '''
+    variances, exp_values, weights = np.broadcast_arrays(
+        *(np.atleast_2d(np.asarray(a, dtype=float))
+          for a in (variances, exp_values, weights))
+    )
+    within = (weights * variances).sum(axis=1)
+    means = (weights * exp_values).sum(axis=1)
+    between = (weights * exp_values**2).sum(axis=1) - means**2
+
+    return within, between, within + between
+
+
+def varianceBruteForce(k: int, tuples_ls=[], dist='binomial', verbose=True):
     '''
     Computes the variance by the standard method. It takes the total
     unconditional probability for each value of 'k' (0 to 'k')
     and computes:
         Var[X] = E[X^2] - E[X]^2
 
+    The probabilities of all values are computed at once in log space
+    (see 'getBinomialLogPmfs'), so large 'k' doesn't overflow.
     (Supports Binomial distribution only)
 
     Parameters:
     -----------
     tuples_ls: [(Proba1, W1), (Proba2, W2), ..., (Proba.n, W.n)]
     k: sample size (X = [0 to k]).
-    '''
-    def iterUntilK(i=0, acc=[]):
-
-        if i > k: return acc
-
-        getProbabilityTuples = lambda tp: (BinomialDist(k, i, tp[0]), tp[1])
-        probabilities = list(map(getProbabilityTuples, tuples_ls))
-
-        print(f'Pr(X = k:{i}) --> ', prepareValues(probabilities))
-        return iterUntilK(i+1, acc+[(i, doubleReduction(probabilities))])
-
-    probaTuples_ls = iterUntilK()
+    verbose: print probabilities for every value of 'k' and summary
+             (unless quiet mode is on).
 
-    E_x = doubleReduction(probaTuples_ls)
-    E_x2 = doubleReduction(probaTuples_ls, 'square')
-
-    print('\n--------------')
-    print('E[X]: ', round(E_x, 3))
-    print('E[X]^2: ', round(E_x**2, 3))
-    print('E[X^2]: ', round(E_x2, 3))
-    print('\nVar[X]: ', round(E_x2 - E_x**2, 3))
-
-    return E_x2 - E_x**2
+    Returns:
+    --------
+    Var[X] (ScalarResult).
+    '''
+    probas, weights = (np.array(ls, dtype=float) for ls in zip(*tuples_ls))
+    pmfs = np.exp(getBinomialLogPmfs(k, probas))
+    mixture = weights @ pmfs
+    values = np.arange(k+1)
+
+    E_x = float(mixture @ values)
+    E_x2 = float(mixture @ values**2)
+
+    def render():
+        perK = lambda i: prepareValues(list(zip(pmfs[:, i].tolist(),
+                                                weights.tolist())))
+        return '\n'.join(
+            [f'Pr(X = k:{i}) -->  {perK(i)}' for i in range(k+1)] + [
+            '\n--------------',
+            f'E[X]:  {round(E_x, 3)}',
+            f'E[X]^2:  {round(E_x**2, 3)}',
+            f'E[X^2]:  {round(E_x2, 3)}',
+            f'\nVar[X]:  {round(E_x2 - E_x**2, 3)}'
+        ])
+
+    return report(ScalarResult(E_x2 - E_x**2, render), verbose)